@@ -0,0 +1,3 @@
+from benchmarks.extraccion import main
+
+main()
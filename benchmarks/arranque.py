@@ -0,0 +1,135 @@
+"""
+Benchmark de arranque en frío: tiempo de importar la app y latencia de la primera petición.
+
+Cada escenario (tipo de archivo × con/sin precarga) se mide en un intérprete nuevo,
+como un worker recién creado:
+
+    python -m benchmarks.arranque --repeticiones 5
+    python -m benchmarks.arranque --gemini-base http://127.0.0.1:8090/v1beta   # + POST /clasificar/
+
+Sin --gemini-base, la primera petición es la extracción del archivo (clasificar_archivo);
+con él, es una petición completa a /clasificar/ contra el servidor local de Gemini.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+TIPOS = ["pdf_digital", "imagen", "word", "excel"]
+
+
+def _hijo(ruta: str, precargar: bool, gemini_base: str):
+    """Intérprete nuevo: mide la importación de la app y sus primeras peticiones."""
+    os.environ["EXTRACCION_CACHE_MAX_ENTRADAS"] = "0"
+    os.environ.pop("EXTRACCION_CACHE_DB", None)
+    os.environ["OCR_CACHE_MAX_PAGINAS"] = "0"
+    os.environ["RESUMEN_CACHE_MAX_ENTRADAS"] = "0"
+    os.environ.pop("RESUMEN_CACHE_DB", None)
+    if gemini_base:
+        os.environ["GEMINI_API_BASE"] = gemini_base
+        os.environ["DISPERSION_URL"] = gemini_base.rsplit("/", 1)[0] + "/dispersion"
+        os.environ.setdefault("GEMINI_API_KEY", "local")
+
+    medicion = {}
+    inicio = time.perf_counter()
+    from clasificador.app import app
+    medicion["importar_app_s"] = time.perf_counter() - inicio
+
+    if precargar:
+        from clasificador.utils.conversor_texto import precargar_extractores
+
+        inicio = time.perf_counter()
+        precargar_extractores()
+        medicion["precarga_s"] = time.perf_counter() - inicio
+
+    cliente = app.test_client()
+    inicio = time.perf_counter()
+    cliente.get("/healthz")
+    medicion["primer_healthz_s"] = time.perf_counter() - inicio
+
+    if gemini_base:
+        inicio = time.perf_counter()
+        with open(ruta, "rb") as f:
+            response = cliente.post("/clasificar/", data={
+                "url": "https://cliente.local/arranque",
+                "archivos": [(f, os.path.basename(ruta))],
+            })
+        medicion["primera_clasificacion_s"] = time.perf_counter() - inicio
+        medicion["codigo"] = response.status_code
+    else:
+        from clasificador.services.clasificador_service import clasificar_archivo
+        from clasificador.utils.archivos_temporales import ArchivoEnDisco
+
+        inicio = time.perf_counter()
+        clasificar_archivo(ArchivoEnDisco(os.path.basename(ruta), None, ruta))
+        medicion["primera_extraccion_s"] = time.perf_counter() - inicio
+
+    print(json.dumps(medicion))
+
+
+def medir(ruta: str, precargar: bool, gemini_base: str) -> dict:
+    comando = [sys.executable, "-m", "benchmarks.arranque", "--hijo", ruta]
+    if precargar:
+        comando.append("--precargar")
+    if gemini_base:
+        comando += ["--gemini-base", gemini_base]
+    proceso = subprocess.run(comando, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        return {"error": proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else proceso.returncode}
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--tipos", nargs="+", default=TIPOS, choices=TIPOS)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "clasificador_corpus"))
+    parser.add_argument("--semilla", type=int, default=2024)
+    parser.add_argument("--gemini-base", help="API base del servidor local de Gemini (benchmarks/servidor_gemini.py)")
+    parser.add_argument("--salida", help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--hijo", help=argparse.SUPPRESS)
+    parser.add_argument("--precargar", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.hijo:
+        _hijo(args.hijo, args.precargar, args.gemini_base)
+        return 0
+
+    from benchmarks.corpus import generar_corpus
+    from benchmarks.extraccion import percentil, _entorno
+
+    manifiesto = generar_corpus(args.corpus, ["pequeno"], args.semilla)
+    resultados = []
+    for entrada in manifiesto:
+        if entrada["tipo"] not in args.tipos:
+            continue
+        ruta = os.path.join(args.corpus, entrada["archivo"])
+        for precargar in (False, True):
+            print(f"⏱️ {entrada['archivo']} · precarga={precargar}", file=sys.stderr)
+            mediciones = [medir(ruta, precargar, args.gemini_base) for _ in range(args.repeticiones)]
+            errores = [m["error"] for m in mediciones if "error" in m]
+            validas = [m for m in mediciones if "error" not in m]
+            campos = sorted({campo for m in validas for campo in m if campo.endswith("_s")})
+            resultados.append({
+                "archivo": entrada["archivo"],
+                "tipo": entrada["tipo"],
+                "precarga": precargar,
+                **{f"{campo}_p50": round(percentil([m[campo] for m in validas], 50), 4) for campo in campos},
+                "codigos": sorted({m["codigo"] for m in validas if "codigo" in m}),
+                "errores": errores,
+            })
+
+    informe = json.dumps({"entorno": _entorno(), "resultados": resultados}, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(informe)
+    else:
+        print(informe)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
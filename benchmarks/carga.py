@@ -0,0 +1,106 @@
+"""
+Generador de carga para /clasificar/ de extremo a extremo.
+
+Con el servidor local de Gemini (benchmarks/servidor_gemini.py) permite medir el
+throughput y la concurrencia sin consumir cuota:
+
+    python -m benchmarks.servidor_gemini --puerto 8090 --latencia-mediana 2 --tasa-429 0.05 &
+    GEMINI_API_KEY=local GEMINI_API_BASE=http://127.0.0.1:8090/v1beta \\
+        DISPERSION_URL=http://127.0.0.1:8090/dispersion \\
+        gunicorn -w 2 --bind 127.0.0.1:8080 clasificador.app:app &
+    python -m benchmarks.carga --url http://127.0.0.1:8080/clasificar/ --concurrencia 8 --peticiones 100
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from benchmarks.corpus import generar_corpus
+from benchmarks.extraccion import percentil
+
+MIMES = {
+    ".pdf": "application/pdf",
+    ".jpg": "image/jpeg",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _enviar(url: str, rutas: list, url_cliente: str, timeout: float, local: threading.local) -> tuple:
+    sesion = getattr(local, "sesion", None)
+    if sesion is None:
+        sesion = local.sesion = requests.Session()
+    archivos = []
+    try:
+        for ruta in rutas:
+            extension = os.path.splitext(ruta)[1]
+            archivos.append(("archivos", (os.path.basename(ruta), open(ruta, "rb"), MIMES.get(extension))))
+        inicio = time.perf_counter()
+        try:
+            response = sesion.post(url, data={"url": url_cliente}, files=archivos, timeout=timeout)
+            estado = response.status_code
+        except requests.exceptions.RequestException as e:
+            estado = type(e).__name__
+        return estado, time.perf_counter() - inicio
+    finally:
+        for _, (_, f, _) in archivos:
+            f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de /clasificar/")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/clasificar/")
+    parser.add_argument("--concurrencia", type=int, default=4)
+    parser.add_argument("--peticiones", type=int, default=40)
+    parser.add_argument("--archivos-por-caso", type=int, default=2)
+    parser.add_argument("--tamanos", nargs="+", default=["pequeno"])
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "clasificador_corpus"))
+    parser.add_argument("--semilla", type=int, default=2024)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--url-cliente", default="https://cliente.local/prueba-carga")
+    parser.add_argument("--salida", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    manifiesto = generar_corpus(args.corpus, args.tamanos, args.semilla)
+    rutas = [os.path.join(args.corpus, entrada["archivo"]) for entrada in manifiesto]
+    rnd = random.Random(args.semilla)
+    casos = [rnd.sample(rutas, min(args.archivos_por_caso, len(rutas))) for _ in range(args.peticiones)]
+
+    local = threading.local()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as executor:
+        resultados = list(executor.map(
+            lambda caso: _enviar(args.url, caso, args.url_cliente, args.timeout, local), casos
+        ))
+    total = time.perf_counter() - inicio
+
+    latencias = [duracion for estado, duracion in resultados if estado == 200]
+    informe = json.dumps({
+        "url": args.url,
+        "concurrencia": args.concurrencia,
+        "peticiones": args.peticiones,
+        "duracion_s": round(total, 2),
+        "peticiones_por_s": round(len(resultados) / total, 3),
+        "exitosas_por_s": round(len(latencias) / total, 3),
+        "estados": {str(k): v for k, v in Counter(estado for estado, _ in resultados).items()},
+        "p50_s": round(percentil(latencias, 50), 3),
+        "p95_s": round(percentil(latencias, 95), 3),
+        "p99_s": round(percentil(latencias, 99), 3),
+    }, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(informe)
+    else:
+        print(informe)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
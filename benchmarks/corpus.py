@@ -0,0 +1,225 @@
+"""
+Corpus sintético y determinista para medir los extractores.
+
+Genera PDFs digitales, PDFs escaneados (rasterizados), fotos de celular (JPG),
+documentos Word grandes y libros Excel de varias hojas. La misma semilla produce
+los mismos archivos, de modo que las mediciones son comparables entre commits.
+"""
+import io
+import json
+import os
+import random
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Tamaños del corpus: páginas por documento, párrafos Word, filas Excel por hoja
+TAMANOS = {
+    "pequeno": {"paginas": 2, "paginas_escaneadas": 1, "parrafos": 50, "hojas": 2, "filas": 200},
+    "mediano": {"paginas": 20, "paginas_escaneadas": 5, "parrafos": 1000, "hojas": 3, "filas": 5000},
+    "grande": {"paginas": 200, "paginas_escaneadas": 30, "parrafos": 10000, "hojas": 5, "filas": 50000},
+}
+
+_SUJETOS = ["El demandante", "La parte accionada", "El Juzgado Tercero Civil del Circuito", "La entidad",
+            "El apoderado judicial", "La señora María Pérez", "El señor Juan Gómez", "El despacho"]
+_VERBOS = ["solicita", "manifiesta", "declara", "admite", "niega", "reconoce", "ordena", "pretende"]
+_OBJETOS = ["el pago de los perjuicios causados", "la nulidad del acto administrativo",
+            "el reintegro al cargo", "la protección del derecho fundamental de petición",
+            "la terminación del contrato de arrendamiento", "la práctica de las pruebas solicitadas",
+            "el reconocimiento de la pensión de vejez", "la notificación personal del auto admisorio"]
+_COMPLEMENTOS = ["de conformidad con el artículo 86 de la Constitución Política.",
+                 "según lo dispuesto en el Código General del Proceso.",
+                 "dentro del término legal.", "con fundamento en los hechos narrados.",
+                 "en la ciudad de Bogotá D.C.", "mediante radicado 11001310300320230012300."]
+_SECCIONES = ["HECHOS", "PRETENSIONES", "FUNDAMENTOS DE DERECHO", "PRUEBAS", "NOTIFICACIONES"]
+
+
+def _oracion(rnd: random.Random) -> str:
+    return " ".join([rnd.choice(_SUJETOS), rnd.choice(_VERBOS), rnd.choice(_OBJETOS), rnd.choice(_COMPLEMENTOS)])
+
+
+def _parrafo(rnd: random.Random, oraciones: int = 4) -> str:
+    return " ".join(_oracion(rnd) for _ in range(oraciones))
+
+
+def _lineas_pagina(rnd: random.Random, numero: int, lineas: int = 45, ancho: int = 90) -> list:
+    """Líneas de una página con encabezado, sección y pie repetidos como en un expediente real."""
+    texto = _parrafo(rnd, 30)
+    palabras = texto.split()
+    cuerpo, actual = [], ""
+    for palabra in palabras:
+        if len(actual) + len(palabra) + 1 > ancho:
+            cuerpo.append(actual)
+            actual = palabra
+            if len(cuerpo) >= lineas:
+                break
+        else:
+            actual = f"{actual} {palabra}".strip()
+    return (["Rama Judicial del Poder Público", rnd.choice(_SECCIONES)] + cuerpo
+            + [f"Página {numero}"])
+
+
+# 🔹 PDF digital: PDF mínimo escrito a mano (sin dependencias), fuente Helvetica
+
+def _escapar_pdf(texto: str) -> bytes:
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+def pdf_digital(paginas: list) -> bytes:
+    """`paginas` es una lista de listas de líneas. Devuelve los bytes de un PDF con texto seleccionable."""
+    objetos = []
+
+    def agregar(contenido: bytes) -> int:
+        objetos.append(contenido)
+        return len(objetos)
+
+    catalogo = agregar(b"")
+    arbol = agregar(b"")
+    fuente = agregar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    hijos = []
+    for lineas in paginas:
+        flujo = b"BT /F1 10 Tf 12 TL 50 800 Td " + b" ".join(b"(" + _escapar_pdf(l) + b") '" for l in lineas) + b" ET"
+        contenido = agregar(b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+        hijos.append(agregar(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (arbol, fuente, contenido)
+        ))
+    objetos[catalogo - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % arbol
+    objetos[arbol - 1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % h for h in hijos) + b"] /Count %d >>" % len(hijos)
+
+    salida = io.BytesIO()
+    salida.write(b"%PDF-1.4\n")
+    posiciones = []
+    for i, contenido in enumerate(objetos, start=1):
+        posiciones.append(salida.tell())
+        salida.write(b"%d 0 obj\n" % i + contenido + b"\nendobj\n")
+    inicio_xref = salida.tell()
+    salida.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1))
+    for posicion in posiciones:
+        salida.write(b"%010d 00000 n \n" % posicion)
+    salida.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, inicio_xref))
+    return salida.getvalue()
+
+
+# 🔹 Páginas rasterizadas (PDF escaneado y fotos)
+
+def _fuente(tamano: int):
+    try:
+        return ImageFont.load_default(size=tamano)
+    except TypeError:  # Pillow < 10.1 no admite fuentes escalables por defecto
+        return ImageFont.load_default()
+
+
+def _ruido(rnd: random.Random, tamano: tuple, intensidad: int) -> Image.Image:
+    """Ruido determinista de baja resolución ampliado (rápido y reproducible)."""
+    pequeno = (max(1, tamano[0] // 8), max(1, tamano[1] // 8))
+    datos = bytes(rnd.randrange(256 - intensidad, 256) for _ in range(pequeno[0] * pequeno[1]))
+    return Image.frombytes("L", pequeno, datos).resize(tamano, Image.BILINEAR)
+
+
+def pagina_raster(rnd: random.Random, lineas: list, dpi: int = 150) -> Image.Image:
+    """Página A4 en escala de grises con leve rotación y ruido, como un escaneo."""
+    ancho, alto = int(8.27 * dpi), int(11.69 * dpi)
+    imagen = Image.new("L", (ancho, alto), 255)
+    dibujo = ImageDraw.Draw(imagen)
+    fuente = _fuente(max(10, dpi // 8))
+    y = dpi // 2
+    for linea in lineas:
+        dibujo.text((dpi // 2, y), linea, fill=20, font=fuente)
+        y += int(dpi / 6)
+    imagen = imagen.rotate(rnd.uniform(-1.5, 1.5), resample=Image.BILINEAR, fillcolor=255)
+    return Image.composite(imagen, _ruido(rnd, imagen.size, 60), imagen.point(lambda p: 255 if p < 128 else 0))
+
+
+def pdf_escaneado(rnd: random.Random, paginas: list) -> bytes:
+    imagenes = [pagina_raster(rnd, lineas) for lineas in paginas]
+    salida = io.BytesIO()
+    imagenes[0].save(salida, format="PDF", save_all=True, append_images=imagenes[1:], resolution=150)
+    return salida.getvalue()
+
+
+def foto_celular(rnd: random.Random, lineas: list) -> bytes:
+    """JPG tipo foto de celular: 12 MP, color, rotado, con iluminación desigual y desenfoque."""
+    pagina = pagina_raster(rnd, lineas, dpi=300).convert("RGB")
+    pagina = pagina.rotate(rnd.uniform(-6, 6), resample=Image.BICUBIC, expand=True, fillcolor=(90, 80, 70))
+    fondo = Image.new("RGB", (4032, 3024), (90, 80, 70))
+    pagina.thumbnail((3800, 2900))
+    fondo.paste(pagina, ((4032 - pagina.width) // 2, (3024 - pagina.height) // 2))
+    sombra = Image.linear_gradient("L").resize(fondo.size).point(lambda p: 160 + p * 95 // 255)
+    fondo = Image.composite(fondo, Image.new("RGB", fondo.size, (0, 0, 0)), sombra)
+    fondo = fondo.filter(ImageFilter.GaussianBlur(1.2))
+    salida = io.BytesIO()
+    fondo.save(salida, format="JPEG", quality=85)
+    return salida.getvalue()
+
+
+# 🔹 Word y Excel
+
+def documento_word(rnd: random.Random, parrafos: int) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for i in range(parrafos):
+        if i % 25 == 0:
+            doc.add_heading(rnd.choice(_SECCIONES), level=2)
+        doc.add_paragraph(_parrafo(rnd))
+    salida = io.BytesIO()
+    doc.save(salida)
+    return salida.getvalue()
+
+
+def libro_excel(rnd: random.Random, hojas: int, filas: int) -> bytes:
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    for h in range(hojas):
+        hoja = libro.create_sheet(f"Hoja{h + 1}")
+        hoja.append(["Radicado", "Fecha", "Concepto", "Valor", "Observaciones"])
+        for f in range(filas):
+            hoja.append([
+                f"1100131030032023{f:07d}",
+                f"2023-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+                rnd.choice(_OBJETOS),
+                round(rnd.uniform(1e5, 5e7), 2),
+                rnd.choice(_COMPLEMENTOS) if f % 3 == 0 else None,
+            ])
+    salida = io.BytesIO()
+    libro.save(salida)
+    return salida.getvalue()
+
+
+# 🔹 Generación del corpus
+
+def generar_corpus(directorio: str, tamanos=("pequeno", "mediano"), semilla: int = 2024) -> list:
+    """
+    Escribe el corpus en `directorio` y devuelve su manifiesto
+    (lista de {"archivo", "tipo", "tamano", "bytes"}). Si ya existe un manifiesto
+    con la misma semilla y tamaños, se reutiliza.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta_manifiesto = os.path.join(directorio, "manifiesto.json")
+    if os.path.exists(ruta_manifiesto):
+        with open(ruta_manifiesto, encoding="utf-8") as f:
+            manifiesto = json.load(f)
+        if manifiesto.get("semilla") == semilla and manifiesto.get("tamanos") == list(tamanos):
+            return manifiesto["archivos"]
+
+    archivos = []
+
+    def escribir(nombre: str, tipo: str, tamano: str, contenido: bytes):
+        with open(os.path.join(directorio, nombre), "wb") as f:
+            f.write(contenido)
+        archivos.append({"archivo": nombre, "tipo": tipo, "tamano": tamano, "bytes": len(contenido)})
+
+    for tamano in tamanos:
+        config = TAMANOS[tamano]
+        rnd = random.Random(f"{semilla}-{tamano}")
+        paginas = [_lineas_pagina(rnd, n + 1) for n in range(config["paginas"])]
+        escribir(f"digital_{tamano}.pdf", "pdf_digital", tamano, pdf_digital(paginas))
+        escribir(f"escaneado_{tamano}.pdf", "pdf_escaneado", tamano,
+                 pdf_escaneado(rnd, paginas[:config["paginas_escaneadas"]]))
+        escribir(f"foto_{tamano}.jpg", "imagen", tamano, foto_celular(rnd, paginas[0]))
+        escribir(f"documento_{tamano}.docx", "word", tamano, documento_word(rnd, config["parrafos"]))
+        escribir(f"libro_{tamano}.xlsx", "excel", tamano, libro_excel(rnd, config["hojas"], config["filas"]))
+
+    with open(ruta_manifiesto, "w", encoding="utf-8") as f:
+        json.dump({"semilla": semilla, "tamanos": list(tamanos), "archivos": archivos}, f, indent=2)
+    return archivos
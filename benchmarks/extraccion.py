@@ -0,0 +1,212 @@
+"""
+Benchmark de los extractores y de clasificar_archivo sobre el corpus sintético.
+
+Uso:
+    python -m benchmarks.extraccion --tamanos pequeno mediano --repeticiones 5 --salida bench.json
+
+Cada caso (extractor × archivo) se ejecuta en un proceso hijo propio, de modo que el
+pico de RSS reportado corresponde solo a ese caso (sumando los procesos del pool de OCR,
+que son sus descendientes). La salida es JSON con throughput,
+latencias p50/p95 y RSS pico, más el entorno (commit, OCR, núcleos) para comparar.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import TAMANOS, generar_corpus
+
+# Extractores aplicables a cada tipo de archivo del corpus
+EXTRACTORES = {
+    "pdf_digital": ["extraer_texto_pdf", "clasificar_archivo"],
+    "pdf_escaneado": ["extraer_texto_pdf_ocr", "extraer_texto_pdf", "clasificar_archivo"],
+    "imagen": ["extraer_texto_imagen", "clasificar_archivo"],
+    "word": ["extraer_texto_word", "clasificar_archivo"],
+    "excel": ["extraer_texto_excel", "clasificar_archivo"],
+}
+
+
+def percentil(valores: list, p: float) -> float:
+    """Percentil por rango más cercano."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+def _descendientes(pid: int) -> list:
+    """PIDs vivos bajo `pid` según /proc (el pool de OCR cuelga del proceso forkserver)."""
+    hijos = {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat") as f:
+                # El nombre del proceso va entre paréntesis y puede tener espacios
+                padre = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        hijos.setdefault(padre, []).append(int(entrada))
+    resultado, pendientes = [], [pid]
+    while pendientes:
+        for hijo in hijos.get(pendientes.pop(), []):
+            resultado.append(hijo)
+            pendientes.append(hijo)
+    return resultado
+
+
+def _vm_hwm_kib(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _rss_pico_mb() -> tuple:
+    """
+    (pico propio, suma de picos de los procesos hijos) en MB. El OCR corre en procesos
+    del pool, así que sin los hijos el pico de los extractores de OCR no dice nada.
+    La suma de picos por proceso es una cota superior del pico conjunto.
+    """
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    unidad = 1024 * 1024 if sys.platform == "darwin" else 1024
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unidad
+    if os.path.isdir("/proc"):
+        hijos = sum(_vm_hwm_kib(pid) for pid in _descendientes(os.getpid())) / 1024
+    else:
+        # Solo procesos hijos ya terminados y esperados (el mayor, no la suma)
+        hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unidad
+    return round(propio, 1), round(hijos, 1)
+
+
+def _ejecutar_caso(extractor: str, ruta: str, repeticiones: int, cola):
+    """Proceso hijo: mide `repeticiones` llamadas del extractor sobre el archivo."""
+    try:
+        # Sin cachés de extracción ni de páginas de OCR: cada repetición mide el trabajo completo
+        os.environ["EXTRACCION_CACHE_MAX_ENTRADAS"] = "0"
+        os.environ.pop("EXTRACCION_CACHE_DB", None)
+        os.environ["OCR_CACHE_MAX_PAGINAS"] = "0"
+        from clasificador.utils import conversor_texto
+        from clasificador.services.clasificador_service import clasificar_archivo
+        from clasificador.utils.archivos_temporales import ArchivoEnDisco
+
+        if extractor == "clasificar_archivo":
+            archivo = ArchivoEnDisco(os.path.basename(ruta), None, ruta)
+            funcion = lambda: clasificar_archivo(archivo).get("texto", "")
+        else:
+            extraer = getattr(conversor_texto, extractor)
+            funcion = lambda: extraer(ruta)
+
+        latencias, texto = [], ""
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            texto = funcion()
+            latencias.append(time.perf_counter() - inicio)
+        cola.put({
+            "latencias": latencias,
+            "caracteres": len(texto),
+            # Los extractores devuelven sus errores como texto: se reportan aparte
+            "error_extraccion": texto[:200] if conversor_texto.es_error_extraccion(texto) else None,
+            # Antes de salir: los procesos del pool de OCR siguen vivos y se pueden leer
+            "rss_pico_mb": _rss_pico_mb(),
+        })
+    except Exception as e:
+        cola.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def medir(extractor: str, ruta: str, repeticiones: int) -> dict:
+    contexto = multiprocessing.get_context("spawn")
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_ejecutar_caso, args=(extractor, ruta, repeticiones, cola))
+    proceso.start()
+    resultado = None
+    while resultado is None:
+        try:
+            resultado = cola.get(timeout=1)
+        except queue.Empty:
+            if not proceso.is_alive():  # p. ej. terminado por falta de memoria
+                resultado = {"error": f"El proceso terminó con código {proceso.exitcode}"}
+    proceso.join()
+    if "error" in resultado:
+        return resultado
+
+    latencias = resultado["latencias"]
+    megabytes = os.path.getsize(ruta) / (1024 * 1024)
+    total = sum(latencias)
+    return {
+        "repeticiones": repeticiones,
+        "p50_s": round(percentil(latencias, 50), 4),
+        "p95_s": round(percentil(latencias, 95), 4),
+        "media_s": round(total / len(latencias), 4),
+        "archivos_por_s": round(len(latencias) / total, 3) if total else None,
+        "mb_por_s": round(megabytes * len(latencias) / total, 3) if total else None,
+        "caracteres": resultado["caracteres"],
+        "error_extraccion": resultado["error_extraccion"],
+        "rss_pico_mb": round(sum(resultado["rss_pico_mb"]), 1),
+        "rss_pico_propio_mb": resultado["rss_pico_mb"][0],
+        "rss_pico_hijos_mb": resultado["rss_pico_mb"][1],
+    }
+
+
+def _entorno() -> dict:
+    from clasificador.utils import conversor_texto
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "nucleos": conversor_texto.nucleos_disponibles(),
+        "ocr_config": conversor_texto.OCR_CONFIG,
+        "ocr_procesos": conversor_texto.OCR_PROCESOS,
+        "extractor_version": conversor_texto.EXTRACTOR_VERSION,
+        # Con presupuesto, los PDF escaneados grandes solo pasan parte de sus páginas por OCR
+        "ocr_presupuesto_documento": conversor_texto.OCR_PRESUPUESTO_DOCUMENTO,
+        "ocr_presupuesto_solicitud": conversor_texto.OCR_PRESUPUESTO_SOLICITUD,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de extracción de texto")
+    parser.add_argument("--tamanos", nargs="+", default=["pequeno", "mediano"], choices=list(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "clasificador_corpus"))
+    parser.add_argument("--semilla", type=int, default=2024)
+    parser.add_argument("--solo", nargs="*", help="Limitar a estos extractores")
+    parser.add_argument("--salida", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    archivos = generar_corpus(args.corpus, args.tamanos, args.semilla)
+    resultados = []
+    for entrada in archivos:
+        ruta = os.path.join(args.corpus, entrada["archivo"])
+        for extractor in EXTRACTORES[entrada["tipo"]]:
+            if args.solo and extractor not in args.solo:
+                continue
+            print(f"⏱️ {extractor} · {entrada['archivo']}", file=sys.stderr)
+            resultados.append({**entrada, "extractor": extractor, **medir(extractor, ruta, args.repeticiones)})
+
+    informe = json.dumps({"entorno": _entorno(), "resultados": resultados}, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(informe)
+    else:
+        print(informe)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Servidor local que imita la API generateContent de Gemini y el servicio de dispersión.
+
+Modos:
+    stub        respuestas sintéticas con la forma de generateContent
+    grabar      reenvía a la API real y guarda cada respuesta en disco
+    reproducir  responde con lo grabado (clave = hash de la petición, sin la API key)
+
+Uso:
+    python -m benchmarks.servidor_gemini --puerto 8090 --modo stub \\
+        --latencia-mediana 1.5 --latencia-sigma 0.5 --tasa-error 0.01 --tasa-429 0.05 \\
+        --tasa-json-invalido 0.02
+
+y en el clasificador:
+    GEMINI_API_BASE=http://127.0.0.1:8090/v1beta DISPERSION_URL=http://127.0.0.1:8090/dispersion
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import requests
+from flask import Flask, jsonify, request
+
+API_REAL = "https://generativelanguage.googleapis.com/v1beta"
+
+RESUMEN_STUB = {
+    "documento": "",
+    "tipo_documento": "Demanda",
+    "resumen": "Documento sintético generado por el servidor de pruebas.",
+    "indicadores_clave": {
+        "partes": "Demandante: Juan Gómez. Demandado: Entidad S.A.",
+        "pretensiones": "Que se declare el incumplimiento del contrato.",
+        "hechos": "Las partes celebraron un contrato que no fue cumplido.",
+        "fundamentos": "Código General del Proceso.",
+        "autoridad": "Juzgado Tercero Civil del Circuito de Bogotá",
+    },
+}
+
+RESULTADO_STUB = {
+    "tipo_documento": "Demanda",
+    "clasificacion": "Civil",
+    "tipo_demanda": "Contractual",
+    "campos": {
+        "tipo_proceso": "Verbal",
+        "partes_involucradas": "Juan Gómez contra Entidad S.A.",
+        "pretensiones": "Que se declare el incumplimiento del contrato.",
+        "hechos_relevantes": "Las partes celebraron un contrato que no fue cumplido.",
+        "normas_citadas": "Código General del Proceso.",
+        "juzgado_o_autoridad": "Juzgado Tercero Civil del Circuito de Bogotá",
+        "fecha_radicacion": "15 de marzo de 2023",
+        "numero_radicado": "11001310300320230012300",
+        "apoderados": "No se menciona en el texto.",
+        "ciudad": "Bogotá D.C.",
+    },
+}
+
+
+def clave_peticion(modelo: str, cuerpo: dict) -> str:
+    """Hash estable de la petición (modelo + cuerpo JSON), sin la API key."""
+    normalizado = json.dumps({"modelo": modelo, "cuerpo": cuerpo}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(normalizado.encode("utf-8")).hexdigest()
+
+
+def respuesta_sintetica(cuerpo: dict, json_invalido: bool = False) -> dict:
+    """
+    Resumen o resultado final según el prompt recibido, envuelto como lo hace Gemini.
+    Con responseMimeType JSON el texto va sin bloque de código; `json_invalido` lo corta
+    a la mitad, como una salida truncada por max_output_tokens.
+    """
+    prompt = "".join(
+        parte.get("text", "")
+        for contenido in cuerpo.get("contents", [])
+        for parte in contenido.get("parts", [])
+    )
+    datos = RESULTADO_STUB if '"campos"' in prompt else RESUMEN_STUB
+    texto = json.dumps(datos, ensure_ascii=False, indent=2)
+    if cuerpo.get("generationConfig", {}).get("responseMimeType") != "application/json":
+        texto = "```json\n" + texto + "\n```"
+    if json_invalido:
+        texto = texto[:len(texto) // 2]
+    return {
+        "candidates": [{"content": {"parts": [{"text": texto}], "role": "model"}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(texto) // 4},
+    }
+
+
+def crear_app(modo: str = "stub", directorio: str = "grabaciones", latencia_mediana: float = 1.0,
+              latencia_sigma: float = 0.5, tasa_error: float = 0.0, tasa_429: float = 0.0,
+              semilla: int = None, api_real: str = API_REAL, tasa_json_invalido: float = 0.0) -> Flask:
+    app = Flask(__name__)
+    rnd = random.Random(semilla)
+    lock = threading.Lock()
+    contadores = {"peticiones": 0, "errores": 0, "limitadas": 0, "grabadas": 0, "reproducidas": 0,
+                  "sin_grabacion": 0, "dispersion": 0, "json_invalido": 0}
+    os.makedirs(directorio, exist_ok=True)
+
+    def sortear():
+        with lock:
+            contadores["peticiones"] += 1
+            return rnd.random(), rnd.lognormvariate(0, latencia_sigma) * latencia_mediana
+
+    def contar(campo: str):
+        with lock:
+            contadores[campo] += 1
+
+    def ruta_grabacion(clave: str) -> str:
+        return os.path.join(directorio, f"{clave}.json")
+
+    @app.route("/v1beta/models/<path:modelo_accion>", methods=["POST"])
+    def generate_content(modelo_accion):
+        modelo, _, accion = modelo_accion.partition(":")
+        if accion != "generateContent":
+            return jsonify({"error": {"code": 404, "message": f"Acción no soportada: {accion}"}}), 404
+        cuerpo = request.get_json(force=True)
+        clave = clave_peticion(modelo, cuerpo)
+
+        if modo == "grabar":
+            response = requests.post(
+                f"{api_real}/models/{modelo}:generateContent",
+                params=request.args, json=cuerpo, timeout=300,
+            )
+            if response.status_code == 200:
+                with open(ruta_grabacion(clave), "w", encoding="utf-8") as f:
+                    json.dump({"modelo": modelo, "peticion": cuerpo, "respuesta": response.json()}, f, ensure_ascii=False)
+                contar("grabadas")
+            return response.content, response.status_code, {"Content-Type": "application/json"}
+
+        sorteo, latencia = sortear()
+        time.sleep(latencia)
+        if sorteo < tasa_429:
+            contar("limitadas")
+            return jsonify({"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}), 429, {"Retry-After": "1"}
+        if sorteo < tasa_429 + tasa_error:
+            contar("errores")
+            return jsonify({"error": {"code": 503, "status": "UNAVAILABLE"}}), 503
+
+        if modo == "reproducir":
+            ruta = ruta_grabacion(clave)
+            if not os.path.exists(ruta):
+                contar("sin_grabacion")
+                return jsonify({"error": {"code": 404, "message": "Petición no grabada", "clave": clave}}), 404
+            with open(ruta, encoding="utf-8") as f:
+                contar("reproducidas")
+                return jsonify(json.load(f)["respuesta"]), 200
+
+        json_invalido = sorteo >= 1 - tasa_json_invalido
+        if json_invalido:
+            contar("json_invalido")
+        return jsonify(respuesta_sintetica(cuerpo, json_invalido)), 200
+
+    @app.route("/dispersion", methods=["POST"])
+    def dispersion():
+        contar("dispersion")
+        return jsonify({"ok": True}), 200
+
+    @app.route("/estadisticas", methods=["GET"])
+    def estadisticas():
+        with lock:
+            return jsonify(dict(contadores)), 200
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita Gemini (generateContent)")
+    parser.add_argument("--puerto", type=int, default=8090)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--modo", choices=["stub", "grabar", "reproducir"], default="stub")
+    parser.add_argument("--directorio", default="grabaciones", help="Dónde se guardan/leen las grabaciones")
+    parser.add_argument("--latencia-mediana", type=float, default=1.0, help="Segundos (distribución lognormal)")
+    parser.add_argument("--latencia-sigma", type=float, default=0.5)
+    parser.add_argument("--tasa-error", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument("--tasa-json-invalido", type=float, default=0.0,
+                        help="Fracción de respuestas con el JSON cortado a la mitad")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--api-real", default=API_REAL, help="API a la que se reenvía en modo grabar")
+    args = parser.parse_args(argv)
+
+    app = crear_app(args.modo, args.directorio, args.latencia_mediana, args.latencia_sigma,
+                    args.tasa_error, args.tasa_429, args.semilla, args.api_real, args.tasa_json_invalido)
+    app.run(host=args.host, port=args.puerto, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
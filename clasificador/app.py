@@ -2,6 +2,7 @@ import sys
 import os
 from flask import Flask
 from clasificador.controllers.clasificador_controller import clasificador_bp
+from clasificador.utils.metricas import exponer_metricas
 
 # Agrega rutas al sys.path solo si lo necesitas (evita esto si usas un paquete con __init__.py)
 #sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -12,6 +13,18 @@ app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100 MB
 app.register_blueprint(clasificador_bp, url_prefix='/clasificar')
 
 
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Comprobación liviana para el balanceador: no toca extractores ni Gemini."""
+    return {"estado": "ok"}, 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metricas():
+    """Métricas de este worker en formato de texto de Prometheus."""
+    return exponer_metricas(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
 
 #port = int(os.environ.get('PORT', 8080))
 #app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
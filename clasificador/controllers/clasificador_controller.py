@@ -1,13 +1,20 @@
-from flask import Blueprint, request, jsonify
-from clasificador.services.clasificador_service import clasificar_archivo, archivo_permitido
-from clasificador.prompts.generador_prompt import generar_prompt, generar_resumenes
-from werkzeug.utils import secure_filename
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+import zipfile
+from flask import Blueprint, Response, request, jsonify, url_for
+from clasificador.services.clasificacion_service import ejecutar_clasificacion
+from clasificador.services.trabajos_service import encolar_trabajo, obtener_trabajo, ColaTrabajosLlena
+from clasificador.utils.cache_extraccion import estadisticas_cache, estadisticas_cache_paginas
+from clasificador.prompts.cache_resumenes import estadisticas_cache as estadisticas_cache_resumenes
+from clasificador.utils.archivos_temporales import volcar_archivos
+from clasificador.services.dispersion_service import notificar_dispersion, estadisticas_dispersion
+from clasificador.services.admision_service import admitir_solicitud, ServicioSaturado
+from clasificador.services.lote_service import (
+    casos_multipart, casos_zip, abrir_zip, lineas_ndjson, LoteInvalido, LOTE_MAX_BYTES, LOTE_MAX_CASOS
+)
+from clasificador.services.progreso_service import formato_progreso, clasificar_con_progreso, MIMETYPES
+from clasificador.utils.metricas import medir_solicitud
 import traceback
 import logging
-import requests
-import os
-import time
 
 clasificador_bp = Blueprint('clasificador', __name__)
 logging.basicConfig(
@@ -17,6 +24,18 @@ logger = logging.getLogger(__name__)
 
 @clasificador_bp.route('/', methods=['POST'])
 def clasificar():
+    # ?progreso=sse|ndjson (o Accept) responde en streaming con eventos por etapa
+    formato = formato_progreso(request.args.get('progreso'), request.accept_mimetypes)
+    if formato:
+        # El desglose de tiempos lo registra el hilo que clasifica
+        return _clasificar(formato)
+    # El desglose de tiempos por etapa se escribe en el log al terminar
+    with medir_solicitud("clasificar") as medicion:
+        respuesta = _clasificar()
+        medicion["codigo"] = respuesta[1]
+        return respuesta
+
+def _clasificar(formato=None):
 
     try:
         #  Recibir múltiples archivos
@@ -35,115 +54,17 @@ def clasificar():
         if not url_cliente:
             return jsonify({'error': 'URL del cliente no recibida'}), 400
 
-        #Extraccion del texto
-
-        def procesar_archivo(archivo):
-            
-            nombre_archivo = secure_filename(archivo.filename)
-            inicio = time.time() #Inicio de medicion individual
-            try:
-                # Ejecuta el clasificador de servicio
-                resultado = clasificar_archivo(archivo)
-
-                #Validar estructura del resultado
-                if not isinstance(resultado, dict):
-                    raise ValueError("La funcion clasificar_archivo no devolvio un diccionario válido")
-                
-                #Validar archivo permitido
-                if not archivo_permitido(archivo.filename, archivo.mimetype):
-                    logger.warning(f"Archivo no permitido o con tipo inválido: {archivo.filename}")
-                
-                if not resultado.get("exito"):
-                    logger.warning(f"⚠️ {nombre_archivo}: {resultado.get('mensaje', 'Sin mensaje')}")
-                    return None, None
-
-                texto_extraido = resultado.get("texto", "")
-
-                if not texto_extraido or len(texto_extraido.strip()) == 0:
-                    logger.warning(f"⚠️ {nombre_archivo}: Texto vacío o ilegible.")
-
-                duracion = round(time.time() - inicio, 2)
-                logger.info(f"✅ Texto extraído correctamente de {nombre_archivo} en {duracion}s")
-                return nombre_archivo, texto_extraido
-
-            except ValueError as ve:
-                logger.warning(f"⚠️ {archivo.filename}: {ve}")    
-            except Exception as e:
-                logger.error(f"❌ Error extrayendo texto de {archivo.filename}: {e}")
-            finally:
-                fin = time.time()
-                logger.info(f"⏱️ Tiempo total {nombre_archivo}: {round(fin - inicio, 2)}s")
-            
-            return None, None
-        
-        documentos ={}
-
-        # 🧠 Ejecutar extracción en paralelo
-        with ThreadPoolExecutor(max_workers= min(4, os.cpu_count() * 2)) as executor:
-            futures = {executor.submit(procesar_archivo, archivo): archivo for archivo in archivos}
-            for future in as_completed(futures):
-                nombre, texto = future.result()
-                if nombre and texto:
-                    documentos[nombre] = texto
-                    
-
-
-        if not documentos:
-            return jsonify({'error': 'No se pudo procesar ningún archivo válido'}),400
-
-        #Llamada a GEMINI (1 o mas archivos)
-
-        try:        
-
-            if len(documentos) == 1:
-                # Solo un archivo → análisis directo
-                nombre, texto = list(documentos.items())[0]
-                logger.info(f"📄 Análisis directo para: {nombre}")
-                resultado_final = generar_prompt([{
-                    "documento": nombre,
-                    "resumen": texto,
-                    "tipo_documento": "Desconocido",
-                    "indicadores_clave": {}
-                }])
-            else:
-                # Varios archivos → flujo normal (resúmenes + análisis final)
-                logger.info(f"📚 Analizando {len(documentos)} documentos del mismo proceso")
-                resumenes = generar_resumenes(documentos)
-                resultado_final = generar_prompt(resumenes)
-            
-        except requests.exceptions.RequestException as re:
-            logger.error(f"🌐 Error de red al llamar a la API de Gemini: {re}")
-            return jsonify({
-                "error": "Error de conexión con el modelo de IA",
-                "detalle": str(re)                
-            }), 503 # Servicio no disponible
-        
-        except Exception as e:
-            logger.error(f"❌ Error en la llamada al modelo Gemini: {e}")
-            return jsonify({
-                "error": "Error al generar la respuesta con Gemini",
-                "detalle": str(e)                
-            }), 502 #Bad Gateway (error del modelo)
-        
-        # Validacion y parseo de respuesta
+        if formato:
+            return _clasificar_con_progreso(archivos, formato)
 
-        if not resultado_final:
-            return jsonify({
-                "error": "Respuesta vacía del modelo de IA",
-            }), 502
-        
-        if isinstance(resultado_final,dict) and "error" in resultado_final:
-            #Error interno desde generador_prompt.py
-            logger.error(f"⚠️ Error en la respuesta del modelo: {resultado_final['error']}")
-            return jsonify({
-                "error": "Ocurrió un problema al interpretar la respuesta de modelo",
-                "detalle": resultado_final["error"]
-            }), 502
-        
-        #Respuesta exitosa
+        # Los archivos se vuelcan a disco y se eliminan al terminar la petición
+        with admitir_solicitud(), volcar_archivos(archivos) as lote:
+            resultado, codigo = ejecutar_clasificacion(lote.archivos)
+        return jsonify(resultado), codigo
 
-        logger.info("✅ Proceso completado exitosamente")
-        return jsonify (resultado_final), 200
+    except ServicioSaturado as e:
+        logger.warning(f"🚦 {e}")
+        return jsonify({"error": "Servidor ocupado, intente más tarde"}), 429, {"Retry-After": str(e.retry_after)}
     
     except MemoryError:
         logger.critical("💥 Error de memoria: el archivo o el texto son demasiado grandes.")
@@ -160,18 +81,123 @@ def clasificar():
             "detalle": str(e)
         }), 500
 
-def notificar_dispersion(url_cliente, funcion):
-    data = {
-        "url": url_cliente,
-        "funcion": funcion
-    }
-
-    response = requests.post(
-        "https://dispersion-718759852530.us-central1.run.app/dispersion",
-        json=data
-    )
-
-    if response.status_code == 200:
-        print("Registro en dispersión exitoso")
-    else:
-        print(f"Error en dispersión: {response.status_code} - {response.text}")
\ No newline at end of file
+def _clasificar_con_progreso(archivos, formato: str):
+    recursos = ExitStack()  # cupo y archivos: los libera el hilo de clasificación al terminar
+    try:
+        recursos.enter_context(admitir_solicitud())
+        lote = recursos.enter_context(volcar_archivos(archivos))
+    except BaseException:
+        recursos.close()
+        raise
+    eventos = clasificar_con_progreso(lote.archivos, recursos, formato)
+    return Response(eventos, mimetype=MIMETYPES[formato], headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # sin buffer en proxies intermedios
+    })
+
+@clasificador_bp.route('/lote', methods=['POST'])
+def clasificar_lote():
+    """
+    Clasifica muchos casos en una sola subida y responde en streaming con una línea
+    NDJSON por caso terminado. Acepta un zip (cuerpo application/zip o campo `lote`)
+    o multipart con archivos[<caso>] y url[<caso>].
+    """
+    request.max_content_length = LOTE_MAX_BYTES
+    recursos = ExitStack()  # archivos temporales: se liberan al cerrar la respuesta
+    try:
+        # Sin cupo de admisión para el lote: cada caso toma el suyo (de a LOTE_CASOS_PARALELOS)
+        url_defecto = request.form.get('url') or request.args.get('url')
+        if request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+            casos = casos_zip(recursos.enter_context(abrir_zip(request.stream)), url_defecto)
+        elif 'lote' in request.files:
+            casos = casos_zip(recursos.enter_context(abrir_zip(request.files['lote'].stream)), url_defecto)
+        else:
+            casos = casos_multipart(request.files, request.form, recursos)
+
+        if not casos:
+            recursos.close()
+            return jsonify({'error': 'No se recibieron casos'}), 400
+        if len(casos) > LOTE_MAX_CASOS:
+            recursos.close()
+            return jsonify({'error': f'El lote supera el máximo de {LOTE_MAX_CASOS} casos'}), 413
+
+        # Una notificación por cliente del lote, no una por caso
+        for url_cliente in {caso['url'] for caso in casos if caso['url']}:
+            notificar_dispersion(url_cliente, 'clasificar_lote')
+        logger.info(f"📦 Lote recibido con {len(casos)} casos")
+
+    except (LoteInvalido, zipfile.BadZipFile) as e:
+        recursos.close()
+        return jsonify({'error': f'Lote inválido: {e}'}), 400
+
+    except Exception as e:
+        recursos.close()
+        logger.critical("❌ ERROR INTERNO DEL SERVIDOR ❌")
+        traceback.print_exc()
+        return jsonify({
+            "error": "Error interno del servidor",
+            "detalle": str(e)
+        }), 500
+
+    respuesta = Response(lineas_ndjson(casos), mimetype='application/x-ndjson')
+    respuesta.call_on_close(recursos.close)
+    return respuesta
+
+@clasificador_bp.route('/jobs', methods=['POST'])
+def crear_trabajo():
+    """Recibe los archivos, encola la clasificación y responde de inmediato con el id del trabajo."""
+    try:
+        archivos = request.files.getlist('archivos')
+        url_cliente = request.form.get('url') or (request.json.get('url') if request.is_json else None)
+
+        funcion = 'clasificar'
+        notificar_dispersion(url_cliente, funcion)
+
+        if not archivos or len(archivos) == 0:
+            return jsonify({'error': 'No se recibieron archivos'}), 400
+
+        if not url_cliente:
+            return jsonify({'error': 'URL del cliente no recibida'}), 400
+
+        trabajo = encolar_trabajo(archivos, url_cliente)
+        url_estado = url_for('clasificador.estado_trabajo', id_trabajo=trabajo['id'])
+        return jsonify({
+            "id": trabajo["id"],
+            "estado": trabajo["estado"],
+            "url_estado": url_estado
+        }), 202, {"Location": url_estado}
+
+    except ColaTrabajosLlena as e:
+        logger.warning(f"🚦 {e}")
+        return jsonify({"error": "Demasiados trabajos en cola, intente más tarde"}), 429, {"Retry-After": "30"}
+
+    except Exception as e:
+        logger.critical("❌ ERROR INTERNO DEL SERVIDOR ❌")
+        traceback.print_exc()
+
+        return jsonify({
+            "error": "Error interno del servidor",
+            "detalle": str(e)
+        }), 500
+
+@clasificador_bp.route('/jobs/<id_trabajo>', methods=['GET'])
+def estado_trabajo(id_trabajo):
+    """Estado del trabajo y, cuando termina, su resultado y código HTTP equivalente."""
+    trabajo = obtener_trabajo(id_trabajo)
+    if not trabajo:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(trabajo), 200
+
+@clasificador_bp.route('/cache', methods=['GET'])
+def cache_estadisticas():
+    """Contadores de aciertos/fallos de las cachés de extracción, páginas de OCR y resúmenes."""
+    return jsonify({
+        "extraccion": estadisticas_cache(),
+        "ocr_paginas": estadisticas_cache_paginas(),
+        "resumenes": estadisticas_cache_resumenes()
+    }), 200
+
+@clasificador_bp.route('/dispersion', methods=['GET'])
+def dispersion_estadisticas():
+    """Contadores del envío en segundo plano a dispersión (incluye descartadas)."""
+    return jsonify(estadisticas_dispersion()), 200
@@ -0,0 +1,40 @@
+import hashlib
+import json
+import os
+from clasificador.utils.cache import CacheDosNiveles
+
+# 🧩 Caché de resúmenes por documento
+# Clave: hash del texto extraído + versión del prompt + modelo + configuración de generación
+# RESUMEN_CACHE_DB: ruta de un SQLite compartido por los workers (opcional)
+RESUMEN_CACHE_MAX_ENTRADAS = int(os.getenv("RESUMEN_CACHE_MAX_ENTRADAS", "512"))
+RESUMEN_CACHE_TTL = float(os.getenv("RESUMEN_CACHE_TTL", str(7 * 24 * 3600)))
+RESUMEN_CACHE_DB = os.getenv("RESUMEN_CACHE_DB") or None
+
+cache_resumenes = CacheDosNiveles(
+    "resumenes",
+    max_entradas=RESUMEN_CACHE_MAX_ENTRADAS,
+    ruta_sqlite=RESUMEN_CACHE_DB,
+    ttl=RESUMEN_CACHE_TTL,
+)
+
+
+def clave_resumen(texto: str, version_prompt: str, modelo: str, configuracion: dict) -> str:
+    contenido = hashlib.sha256(texto.encode("utf-8")).hexdigest()
+    parametros = json.dumps({"prompt": version_prompt, "modelo": modelo, "config": configuracion}, sort_keys=True)
+    return f"{contenido}:{hashlib.sha256(parametros.encode()).hexdigest()[:16]}"
+
+
+def obtener_resumen(clave: str):
+    valor = cache_resumenes.obtener(clave)
+    return json.loads(valor) if valor is not None else None
+
+
+def guardar_resumen(clave: str, resumen: dict):
+    """Solo se guardan resúmenes estructurados completos; los errores nunca se cachean."""
+    if not isinstance(resumen, dict) or "error" in resumen or resumen.get("fragmentos_fallidos"):
+        return
+    cache_resumenes.guardar(clave, json.dumps(resumen, ensure_ascii=False))
+
+
+def estadisticas_cache() -> dict:
+    return cache_resumenes.estadisticas()
@@ -0,0 +1,113 @@
+import math
+import os
+import random
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from clasificador.prompts.fragmentador import CARACTERES_POR_TOKEN
+from clasificador.utils.metricas import cronometro, CARACTERES_PROMPT, TOKENS_PROMPT
+
+# 🧩 Cliente HTTP único para Gemini: sesión con pool de conexiones (keep-alive),
+# reintentos con backoff exponencial + jitter y límite de llamadas simultáneas
+
+# GEMINI_API_BASE permite apuntar a un servidor local (benchmarks/servidor_gemini.py)
+GEMINI_MODELO = os.getenv("GEMINI_MODELO", "gemini-2.0-flash")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+GEMINI_URL = f"{GEMINI_API_BASE}/models/{GEMINI_MODELO}:generateContent"
+
+GEMINI_MAX_CONCURRENCIA = int(os.getenv("GEMINI_MAX_CONCURRENCIA", "8"))
+GEMINI_MAX_REINTENTOS = int(os.getenv("GEMINI_MAX_REINTENTOS", "4"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1.0"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "30"))
+GEMINI_TIMEOUT_CONEXION = float(os.getenv("GEMINI_TIMEOUT_CONEXION", "10"))
+
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+_sesion = None
+_sesion_pid = None
+_sesion_lock = threading.Lock()
+
+# Limita las llamadas simultáneas a Gemini en todo el proceso
+_semaforo = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCIA)
+
+
+def obtener_sesion() -> requests.Session:
+    """Sesión compartida por el proceso (se recrea tras un fork de gunicorn)."""
+    global _sesion, _sesion_pid
+    with _sesion_lock:
+        if _sesion is None or _sesion_pid != os.getpid():
+            sesion = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=GEMINI_MAX_CONCURRENCIA)
+            sesion.mount("https://", adaptador)
+            sesion.mount("http://", adaptador)
+            _sesion, _sesion_pid = sesion, os.getpid()
+        return _sesion
+
+
+def _espera_reintento(intento: int, response=None) -> float:
+    """Backoff exponencial con jitter completo; respeta Retry-After si viene en la respuesta."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), GEMINI_BACKOFF_MAX)
+            except ValueError:
+                pass
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** intento)))
+
+
+def _registrar_prompt(payload: dict, llamada: str):
+    caracteres = sum(
+        len(parte.get("text", ""))
+        for contenido in payload.get("contents", [])
+        for parte in contenido.get("parts", [])
+    )
+    CARACTERES_PROMPT.incrementar(caracteres, llamada=llamada)
+    TOKENS_PROMPT.incrementar(math.ceil(caracteres / CARACTERES_POR_TOKEN), llamada=llamada)
+
+
+def llamar_gemini(payload: dict, api_key: str, timeout: float, llamada: str = "generico") -> requests.Response:
+    """
+    Envía `payload` a generateContent y devuelve la respuesta HTTP final.
+    Reintenta ante 429/5xx y errores de conexión; los timeouts de lectura no se
+    reintentan. Si se agotan los reintentos lanza la excepción de requests correspondiente.
+    `llamada` etiqueta las métricas (resumen, final, ...).
+    """
+    _registrar_prompt(payload, llamada)
+    with cronometro(f"gemini_{llamada}"):
+        return _llamar_con_reintentos(payload, api_key, timeout)
+
+
+def _llamar_con_reintentos(payload: dict, api_key: str, timeout: float) -> requests.Response:
+    sesion = obtener_sesion()
+    for intento in range(GEMINI_MAX_REINTENTOS + 1):
+        ultimo = intento == GEMINI_MAX_REINTENTOS
+        try:
+            with _semaforo:
+                response = sesion.post(
+                    GEMINI_URL,
+                    params={"key": api_key},
+                    json=payload,
+                    timeout=(GEMINI_TIMEOUT_CONEXION, timeout),
+                )
+        except requests.exceptions.ConnectionError as e:
+            if ultimo:
+                raise
+            espera = _espera_reintento(intento)
+            logger.warning(f"🌐 Error de conexión con Gemini ({e}), reintento en {espera:.1f}s")
+            time.sleep(espera)
+            continue
+
+        if response.status_code in ESTADOS_REINTENTABLES and not ultimo:
+            espera = _espera_reintento(intento, response)
+            logger.warning(f"⏳ Gemini respondió {response.status_code}, reintento en {espera:.1f}s")
+            response.close()
+            time.sleep(espera)
+            continue
+
+        response.raise_for_status()
+        return response
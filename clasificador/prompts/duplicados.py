@@ -0,0 +1,97 @@
+import hashlib
+import heapq
+import os
+import re
+import unicodedata
+import zlib
+
+# 🧩 Documentos duplicados o casi duplicados dentro de un caso (mismo PDF con dos
+# nombres, original + re-escaneo). Se resumen una sola vez: queda la copia más completa.
+# Huella MinHash en su variante bottom-k (un solo hash por shingle de palabras y los k
+# menores), suficiente para comparar los pocos documentos de un caso sin dependencias.
+DUPLICADOS_ACTIVO = os.getenv("DUPLICADOS_ACTIVO", "1") == "1"
+DUPLICADOS_UMBRAL = float(os.getenv("DUPLICADOS_UMBRAL", "0.85"))  # similitud de Jaccard estimada
+DUPLICADOS_TAMANO_SHINGLE = 3  # palabras por shingle: tolera errores sueltos de OCR
+DUPLICADOS_K = 256
+# Por debajo de esta cantidad de palabras solo se fusionan copias exactas
+DUPLICADOS_MIN_PALABRAS = 30
+
+_PALABRA = re.compile(r"\w+")
+
+
+def _palabras(texto: str) -> list:
+    sin_tildes = "".join(
+        c for c in unicodedata.normalize("NFD", texto.lower()) if unicodedata.category(c) != "Mn"
+    )
+    return _PALABRA.findall(sin_tildes)
+
+
+class Huella:
+    """Huella de un documento: hash exacto del texto normalizado y firma bottom-k."""
+
+    def __init__(self, texto: str):
+        palabras = _palabras(texto)
+        self.palabras = len(palabras)
+        self.exacta = hashlib.sha256(" ".join(palabras).encode("utf-8")).hexdigest()
+        n = DUPLICADOS_TAMANO_SHINGLE
+        shingles = {
+            zlib.crc32(" ".join(palabras[i:i + n]).encode("utf-8"))
+            for i in range(max(1, len(palabras) - n + 1))
+        }
+        self.firma = set(heapq.nsmallest(DUPLICADOS_K, shingles))
+
+    def similitud(self, otra: "Huella") -> float:
+        """Jaccard estimada: fracción de los k menores de la unión presentes en ambas firmas."""
+        if self.exacta == otra.exacta:
+            return 1.0
+        union = heapq.nsmallest(DUPLICADOS_K, self.firma | otra.firma)
+        if not union:
+            return 0.0
+        return sum(1 for h in union if h in self.firma and h in otra.firma) / len(union)
+
+    def duplica(self, otra: "Huella") -> bool:
+        if self.exacta == otra.exacta:
+            return True
+        if min(self.palabras, otra.palabras) < DUPLICADOS_MIN_PALABRAS:
+            return False
+        return self.similitud(otra) >= DUPLICADOS_UMBRAL
+
+
+def agrupar_duplicados(documentos: dict) -> tuple:
+    """
+    documentos: {nombre: texto}. Devuelve (documentos_sin_duplicados, fusionados), donde
+    fusionados es {nombre_conservado: [nombres_descartados]}. Se conserva la copia con
+    más palabras y el orden original de los documentos.
+    """
+    if not DUPLICADOS_ACTIVO or len(documentos) < 2:
+        return documentos, {}
+
+    nombres = list(documentos)
+    huellas = {nombre: Huella(documentos[nombre]) for nombre in nombres}
+
+    # Unión de grupos (todos contra todos: los casos traen pocos documentos)
+    grupo = {nombre: nombre for nombre in nombres}
+
+    def raiz(nombre):
+        while grupo[nombre] != nombre:
+            grupo[nombre] = grupo[grupo[nombre]]
+            nombre = grupo[nombre]
+        return nombre
+
+    for i, a in enumerate(nombres):
+        for b in nombres[i + 1:]:
+            if raiz(a) != raiz(b) and huellas[a].duplica(huellas[b]):
+                grupo[raiz(b)] = raiz(a)
+
+    miembros = {}
+    for nombre in nombres:
+        miembros.setdefault(raiz(nombre), []).append(nombre)
+
+    conservados, fusionados = set(), {}
+    for grupo_nombres in miembros.values():
+        mejor = max(grupo_nombres, key=lambda n: (huellas[n].palabras, -nombres.index(n)))
+        conservados.add(mejor)
+        if len(grupo_nombres) > 1:
+            fusionados[mejor] = [n for n in grupo_nombres if n != mejor]
+
+    return {n: documentos[n] for n in nombres if n in conservados}, fusionados
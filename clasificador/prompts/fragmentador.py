@@ -0,0 +1,66 @@
+import math
+import re
+
+# 🧩 Fragmentación de textos largos para resumir por partes (map-reduce)
+
+# Aproximación para español con el tokenizador de Gemini (~4 caracteres por token)
+CARACTERES_POR_TOKEN = 4
+
+# Encabezados típicos de escritos judiciales: se prefieren como punto de corte
+_SECCIONES = re.compile(
+    r"(?=\b(?:HECHOS|PRETENSIONES|FUNDAMENTOS\s+DE\s+DERECHO|FUNDAMENTOS|PRUEBAS|ANEXOS|"
+    r"NOTIFICACIONES|COMPETENCIA|CUANTÍA|CUANTIA|JURAMENTO|CONSIDERACIONES|CONSIDERANDO|"
+    r"ANTECEDENTES|RESUELVE|DECISIÓN|DECISION|PETICIONES|SOLICITUD)\b)"
+)
+
+# De mayor a menor preferencia: sección, párrafo, línea, oración, palabra
+_SEPARADORES = [_SECCIONES, re.compile(r"\n\s*\n"), re.compile(r"\n"), re.compile(r"(?<=[.;:])\s+"), re.compile(r"\s+")]
+
+
+def estimar_tokens(texto: str) -> int:
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def _partir(texto: str, max_caracteres: int, nivel: int = 0) -> list:
+    """Divide recursivamente con el separador más fuerte posible hasta que cada pieza quepa."""
+    if len(texto) <= max_caracteres:
+        return [texto]
+    if nivel >= len(_SEPARADORES):
+        return [texto[i:i + max_caracteres] for i in range(0, len(texto), max_caracteres)]
+
+    piezas = [p for p in _SEPARADORES[nivel].split(texto) if p.strip()]
+    if len(piezas) <= 1:
+        return _partir(texto, max_caracteres, nivel + 1)
+
+    resultado = []
+    for pieza in piezas:
+        resultado.extend(_partir(pieza, max_caracteres, nivel + 1))
+    return resultado
+
+
+def fragmentar_texto(texto: str, max_tokens: int, max_fragmentos: int = None) -> list:
+    """
+    Divide `texto` en fragmentos de como máximo `max_tokens` (estimados), cortando
+    preferentemente en secciones y párrafos y agrupando piezas contiguas.
+    Si se superaría `max_fragmentos`, se amplía el tamaño de fragmento en proporción.
+    """
+    texto = texto.strip()
+    if max_fragmentos and estimar_tokens(texto) > max_tokens * max_fragmentos:
+        max_tokens = math.ceil(estimar_tokens(texto) / max_fragmentos)
+    max_caracteres = max_tokens * CARACTERES_POR_TOKEN
+
+    fragmentos = []
+    actual = ""
+    for pieza in _partir(texto, max_caracteres):
+        if actual and len(actual) + 1 + len(pieza) > max_caracteres:
+            fragmentos.append(actual.strip())
+            actual = ""
+        actual = f"{actual} {pieza}" if actual else pieza
+    if actual.strip():
+        fragmentos.append(actual.strip())
+
+    # El empaquetado puede dejar algún fragmento de más: se unen los vecinos más cortos
+    while max_fragmentos and len(fragmentos) > max_fragmentos:
+        i = min(range(len(fragmentos) - 1), key=lambda k: len(fragmentos[k]) + len(fragmentos[k + 1]))
+        fragmentos[i:i + 2] = [f"{fragmentos[i]} {fragmentos[i + 1]}"]
+    return fragmentos
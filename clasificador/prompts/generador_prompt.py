@@ -1,27 +1,84 @@
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import os
-import json
 import re
 import logging
-
+from clasificador.prompts.cliente_gemini import llamar_gemini, GEMINI_MODELO
+from clasificador.utils.metricas import propagar_contexto
+from clasificador.prompts.cache_resumenes import clave_resumen, obtener_resumen, guardar_resumen
+from clasificador.prompts.fragmentador import fragmentar_texto, estimar_tokens, CARACTERES_POR_TOKEN
+from clasificador.prompts.reglas_procesales import CAMPOS_FINALES
+from clasificador.prompts.presupuesto_prompt import ajustar_resumenes
+from clasificador.prompts.salida_estructurada import (
+    esquema_objeto, esquema_textos, configuracion_generacion, texto_respuesta, interpretar_json
+)
+
+# Sin API key la app arranca igual (healthz, métricas, extracción) y las llamadas a
+# Gemini responden con error; la ausencia se advierte al precargar (gunicorn.conf.py)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise EnvironmentError("No se encontró GEMINI_API_KEY en el entorno.")
+
+# Timeouts de lectura (s) por tipo de llamada
+GEMINI_TIMEOUT_RESUMEN = float(os.getenv("GEMINI_TIMEOUT_RESUMEN", "120"))
+GEMINI_TIMEOUT_FINAL = float(os.getenv("GEMINI_TIMEOUT_FINAL", "300"))
+
+# Resumen por fragmentos (map-reduce) de documentos largos
+RESUMEN_MAX_TOKENS_FRAGMENTO = int(os.getenv("RESUMEN_MAX_TOKENS_FRAGMENTO", "5000"))
+RESUMEN_MAX_FRAGMENTOS = int(os.getenv("RESUMEN_MAX_FRAGMENTOS", "12"))
+RESUMEN_FRAGMENTOS_PARALELOS = int(os.getenv("RESUMEN_FRAGMENTOS_PARALELOS", "4"))
+
+# Incrementar si cambia resumen_parcial_prompt: invalida la caché de resúmenes
+PROMPT_RESUMEN_VERSION = "1"
+GENERACION_RESUMEN = {
+    "temperature":0.2,       # Controla la “creatividad” (0 = literal, 1 = más libre)
+    "max_output_tokens":2048
+}
+
+CAMPOS_INDICADORES = ["partes", "pretensiones", "hechos", "fundamentos", "autoridad"]
+NO_SE_MENCIONA = "No se menciona en el texto."
+
+# Esquemas de respuesta (misma estructura que el formato pedido en cada prompt)
+ESQUEMA_RESUMEN = esquema_objeto({
+    "documento": {"type": "STRING"},
+    "tipo_documento": {"type": "STRING"},
+    "resumen": {"type": "STRING"},
+    "indicadores_clave": esquema_textos(CAMPOS_INDICADORES),
+})
+ESQUEMA_FINAL = esquema_objeto({
+    "tipo_documento": {"type": "STRING"},
+    "clasificacion": {"type": "STRING"},
+    "tipo_demanda": {"type": "STRING"},
+    "campos": esquema_textos(CAMPOS_FINALES),
+})
+GENERACION_FINAL = {
+    "temperature":0.2,       # Controla la “creatividad” (0 = literal, 1 = más libre)
+    "max_output_tokens":8192
+}
+
+logger = logging.getLogger(__name__)
 
 #Prompt que resume cada documento para alimentar el prompt final
 
-def resumen_parcial_prompt(nombre_doc: str, texto: str) -> str:
+def resumen_parcial_prompt(nombre_doc: str, texto: str, fragmento: tuple = None) -> str:
     if not GEMINI_API_KEY:
         return {"error": "API key no configurada"}
 
+    # Los fragmentos ya vienen acotados por fragmentar_texto; el resto se limita por seguridad
+    if not fragmento:
+        texto = texto[:RESUMEN_MAX_TOKENS_FRAGMENTO * CARACTERES_POR_TOKEN]
+    aviso_fragmento = ""
+    if fragmento:
+        aviso_fragmento = (
+            f"\nEste texto es el fragmento {fragmento[0]} de {fragmento[1]} del documento; "
+            "resume solo lo que aparece en él.\n"
+        )
+
     return f"""
 Eres un asistente jurídico colombiano. Resume brevemente el siguiente documento judicial
 sin perder la información jurídica esencial.  
-
+{aviso_fragmento}
 ENTRADA:
 <documento nombre="{nombre_doc}">
-{texto[:20000]}  # límite seguro para Gemini (~15-20k tokens)
+{texto}
 </documento>
 
 Tu salida debe ser un JSON con esta estructura exacta:
@@ -47,49 +104,136 @@ Reglas:
 """
 
 def procesar_documento(nombre: str, texto: str):
-    prompt = resumen_parcial_prompt(nombre, texto)
-
-    response = requests.post(
-        "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
-        params={"key": GEMINI_API_KEY},
-        json={
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig":{
-            "temperature":0.2,       # Controla la “creatividad” (0 = literal, 1 = más libre)
-            "max_output_tokens":2048
-            }
+    """
+    Resume un documento. Si excede RESUMEN_MAX_TOKENS_FRAGMENTO se divide en secciones
+    y párrafos, se resume cada fragmento en paralelo y se fusionan los JSON parciales.
+    """
+    if estimar_tokens(texto) <= RESUMEN_MAX_TOKENS_FRAGMENTO:
+        return _resumir(nombre, texto)
+
+    fragmentos = fragmentar_texto(texto, RESUMEN_MAX_TOKENS_FRAGMENTO, RESUMEN_MAX_FRAGMENTOS)
+    logger.info(f"✂️ {nombre}: {estimar_tokens(texto)} tokens estimados en {len(fragmentos)} fragmentos")
+
+    total = len(fragmentos)
+    with ThreadPoolExecutor(max_workers=min(RESUMEN_FRAGMENTOS_PARALELOS, total)) as executor:
+        # Un contexto copiado por tarea: un mismo contexto no puede ejecutarse en dos hilos a la vez
+        futures = [
+            executor.submit(propagar_contexto(_resumir), nombre, fragmentos[i], (i + 1, total))
+            for i in range(total)
+        ]
+        parciales = [future.result() for future in futures]
+    return fusionar_resumenes(nombre, parciales)
+
+
+def fusionar_resumenes(nombre: str, parciales: list) -> dict:
+    """Une los resúmenes de los fragmentos (en orden) en un único resumen del documento."""
+    validos = [p for p in parciales if isinstance(p, dict) and "error" not in p]
+    if not validos:
+        return {"documento": nombre, "error": "No se pudo generar resumen"}
+
+    def unir(valores):
+        vistos = []
+        for valor in valores:
+            valor = str(valor or "").strip()
+            if valor and not valor.startswith("No se menciona") and valor not in vistos:
+                vistos.append(valor)
+        return " ".join(vistos) or NO_SE_MENCIONA
+
+    tipos = [p.get("tipo_documento") for p in validos if p.get("tipo_documento")]
+    resumen = {
+        "documento": nombre,
+        "tipo_documento": max(set(tipos), key=tipos.count) if tipos else "",
+        "resumen": unir(p.get("resumen") for p in validos),
+        "indicadores_clave": {
+            campo: unir((p.get("indicadores_clave") or {}).get(campo) for p in validos)
+            for campo in CAMPOS_INDICADORES
         },
-    )
+    }
+    if len(validos) < len(parciales):
+        resumen["fragmentos_fallidos"] = len(parciales) - len(validos)
+    return resumen
+
+
+def _resumir(nombre: str, texto: str, fragmento: tuple = None):
+    if not GEMINI_API_KEY:
+        return {"documento": nombre, "error": "API key no configurada"}
+    prompt = resumen_parcial_prompt(nombre, texto, fragmento)
+
     try:
-        result = response.json()
-        text_result = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-        text_result = re.sub(r"```json|```", "", text_result).strip()
-        return json.loads(text_result)
+        response = llamar_gemini(
+            {
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": configuracion_generacion(GENERACION_RESUMEN, ESQUEMA_RESUMEN)
+            },
+            GEMINI_API_KEY,
+            timeout=GEMINI_TIMEOUT_RESUMEN,
+            llamada="resumen",
+        )
+        return interpretar_json(texto_respuesta(response), ESQUEMA_RESUMEN, "resumen", GEMINI_API_KEY)
     except Exception as e:
         print(f"⚠️ Error procesando {nombre}: {e}")
         return {"documento": nombre, "error": "No se pudo generar resumen"}
     
-def generar_resumenes(documentos: dict):
+def _clave_resumen(texto: str) -> str:
+    # generationConfig tal como se envía: con la salida estructurada incluye el esquema
+    configuracion = {
+        "generacion": configuracion_generacion(GENERACION_RESUMEN, ESQUEMA_RESUMEN),
+        "max_tokens_fragmento": RESUMEN_MAX_TOKENS_FRAGMENTO,
+        "max_fragmentos": RESUMEN_MAX_FRAGMENTOS,
+    }
+    return clave_resumen(texto, PROMPT_RESUMEN_VERSION, GEMINI_MODELO, configuracion)
+
+
+def _evento_resumen(nombre: str, resumen: dict, cache: bool) -> dict:
+    return {
+        "documento": nombre,
+        "tipo_documento": resumen.get("tipo_documento"),
+        "cache": cache,
+        "error": resumen.get("error"),
+    }
+
+
+def generar_resumenes(documentos: dict, progreso=None):
     """
     documentos: dict con {nombre_archivo: texto_extraido}
     Procesa los documentos en paralelo para obtener sus resúmenes parciales.
+    Los textos ya resumidos (misma versión de prompt, modelo y configuración) se toman de caché.
+    `progreso("resumen", ...)` se llama en este hilo a medida que cada resumen está listo.
     """
+    progreso = progreso or (lambda evento, **datos: None)
     resultados = []
-    logger = logging.getLogger(__name__)
+    pendientes = {}
+
+    for nombre, texto in documentos.items():
+        clave = _clave_resumen(texto)
+        resumen = obtener_resumen(clave)
+        if resumen is not None:
+            resumen["documento"] = nombre
+            resultados.append(resumen)
+            progreso("resumen", **_evento_resumen(nombre, resumen, cache=True))
+            logger.info(f"♻️ Resumen de {nombre} recuperado de caché")
+        else:
+            pendientes[nombre] = (texto, clave)
+
+    if not pendientes:
+        return resultados
 
     with ThreadPoolExecutor(max_workers=min(4, os.cpu_count() * 2)) as executor:
         futures = {
-            executor.submit(procesar_documento, nombre, texto): nombre
-            for nombre, texto in documentos.items()
+            executor.submit(propagar_contexto(procesar_documento), nombre, texto): (nombre, clave)
+            for nombre, (texto, clave) in pendientes.items()
         }
 
         for future in as_completed(futures):
-            nombre = futures[future]
+            nombre, clave = futures[future]
             try:
                 resumen = future.result()
+                guardar_resumen(clave, resumen)
                 resultados.append(resumen)
+                progreso("resumen", **_evento_resumen(nombre, resumen, cache=False))
                 logger.info(f"✅ Resumen generado para {nombre}")
             except Exception as e:
+                progreso("resumen", documento=nombre, tipo_documento=None, cache=False, error=str(e))
                 logger.error(f"❌ Error generando resumen de {nombre}: {e}")
 
     return resultados
@@ -100,6 +244,9 @@ def generar_prompt(resumenes_json):
     if not GEMINI_API_KEY:
         return {"error": "API key no configurada"}
 
+    # 🔹 Cada documento ocupa como máximo la parte del presupuesto que le toca por su rol
+    resumenes_json = ajustar_resumenes(resumenes_json)
+
     # 🔹 Convertir los resúmenes a formato legible con delimitadores semánticos
     documentos_texto = ""
     for r in resumenes_json:
@@ -198,19 +345,15 @@ CONTENIDO:
 """
     try:
     # ✅ Aquí ya no retornamos, sino que llamamos al endpoint
-        response = requests.post(
-            "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
-            params={"key": GEMINI_API_KEY},
-            json={
+        response = llamar_gemini(
+            {
                 "contents": [{"parts": [{"text": prompt}]}],
-                "generationConfig":{
-                "temperature":0.2,       # Controla la “creatividad” (0 = literal, 1 = más libre)
-                "max_output_tokens":8192
-                }
+                "generationConfig": configuracion_generacion(GENERACION_FINAL, ESQUEMA_FINAL)
             },
-            timeout= 300
+            GEMINI_API_KEY,
+            timeout=GEMINI_TIMEOUT_FINAL,
+            llamada="final",
         )
-        response.raise_for_status()
     except requests.exceptions.Timeout:
         return {"error": "Tiempo de espera agotado al comunicarse con la API de Gemini"}
     except requests.exceptions.RequestException as e:
@@ -219,13 +362,7 @@ CONTENIDO:
     if response.status_code != 200:
         return {"error": response.text}
     try:
-        result = response.json()
-        text_result = (
-            result.get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [{}])[0]
-            .get("text", "")
-        )    
+        text_result = texto_respuesta(response)
         if not text_result.strip():
             raise ValueError("Respuesta vacía del modelo de IA.")
     except ValueError as ve:
@@ -233,12 +370,13 @@ CONTENIDO:
     except Exception as e:
         return{"error": f"No se pudo interpretar la respuesta de Gemini: {str(e)}"}    
 
-    # Limpieza del texto antes de parsear
-    text_result = re.sub(r"```json|```", "", str(text_result)).strip()
-    text_result = re.sub(r'(:\s*")([^"]*?)"([^"]*?")', r'\1\2\\\"\3', text_result)
+    return _parsear_respuesta_final(text_result)
+
 
+def _parsear_respuesta_final(text_result: str) -> dict:
+    """Convierte la respuesta del modelo a JSON (con una reparación si hace falta) y la limpia."""
     try:
-        json_result = json.loads(text_result)
+        json_result = interpretar_json(text_result, ESQUEMA_FINAL, "final", GEMINI_API_KEY)
 
         # Si "contenido" es lista de diccionarios → unificar
         if isinstance(json_result.get("contenido"), list):
@@ -0,0 +1,126 @@
+import os
+import re
+import logging
+from clasificador.prompts.fragmentador import estimar_tokens, CARACTERES_POR_TOKEN
+from clasificador.utils.metricas import Contador
+
+# 🧩 Presupuesto de tokens de los documentos en el prompt final
+# Cada documento recibe una parte proporcional al peso de su rol (el escrito principal
+# más que los autos complementarios); lo que un documento no usa se reparte entre los
+# demás. Solo se recortan los documentos que exceden su parte.
+PROMPT_MAX_TOKENS_DOCUMENTOS = int(os.getenv("PROMPT_MAX_TOKENS_DOCUMENTOS", "12000"))
+
+PRINCIPAL = "principal"
+COMPLEMENTARIO = "complementario"
+OTRO = "otro"
+PESOS_ROL = {PRINCIPAL: 3, OTRO: 2, COMPLEMENTARIO: 1}
+
+# Mismos criterios que el prompt final: demanda/tutela/solicitud son el documento principal,
+# autos/providencias/fallos completan datos procesales
+_COMPLEMENTARIO = re.compile(
+    r"\s*(?:auto|providencia|fallo|sentencia|resoluci[oó]n|acta|notificaci[oó]n|constancia|oficio|"
+    r"anexo|poder|certificad)", re.IGNORECASE)
+_PRINCIPAL = re.compile(
+    r"demanda|tutela|acci[oó]n|solicitud|petici[oó]n|denuncia|querella|contestaci[oó]n", re.IGNORECASE)
+
+MARCA_RECORTE = " […] "
+
+DOCUMENTOS_RECORTADOS = Contador(
+    "clasificador_prompt_documentos_recortados_total", "Documentos recortados para caber en el prompt final", ("rol",))
+
+logger = logging.getLogger(__name__)
+
+
+def rol_documento(resumen: dict) -> str:
+    tipo = str(resumen.get("tipo_documento") or "")
+    if _COMPLEMENTARIO.match(tipo):
+        return COMPLEMENTARIO
+    if _PRINCIPAL.search(tipo):
+        return PRINCIPAL
+    return OTRO
+
+
+def asignar_presupuesto(demandas: dict, pesos: dict, total: int) -> dict:
+    """
+    Reparte `total` tokens entre documentos ({nombre: tokens_necesarios}) según sus pesos.
+    Quien necesita menos que su parte recibe lo que necesita y el sobrante se vuelve a repartir.
+    """
+    asignacion, pendientes, restante = {}, dict(demandas), total
+    while pendientes:
+        peso_total = sum(pesos[nombre] for nombre in pendientes)
+        cubiertos = {
+            nombre: necesarios for nombre, necesarios in pendientes.items()
+            if necesarios <= restante * pesos[nombre] / peso_total
+        }
+        if not cubiertos:
+            for nombre in pendientes:
+                asignacion[nombre] = int(restante * pesos[nombre] / peso_total)
+            break
+        for nombre, necesarios in cubiertos.items():
+            asignacion[nombre] = necesarios
+            restante -= necesarios
+            del pendientes[nombre]
+    return asignacion
+
+
+def recortar_texto(texto: str, max_tokens: int, fraccion_final: float = 0.0) -> str:
+    """Recorta en límites de palabra; con `fraccion_final` conserva también el cierre del texto."""
+    max_caracteres = max(0, max_tokens * CARACTERES_POR_TOKEN - len(MARCA_RECORTE))
+    if len(texto) <= max_tokens * CARACTERES_POR_TOKEN:
+        return texto
+    final = int(max_caracteres * fraccion_final)
+    inicio = texto[:max_caracteres - final].rsplit(" ", 1)[0]
+    cierre = texto[len(texto) - final:].split(" ", 1)[-1] if final else ""
+    return f"{inicio}{MARCA_RECORTE}{cierre}".strip()
+
+
+def _campos_texto(resumen: dict) -> dict:
+    campos = {"resumen": str(resumen.get("resumen") or "")}
+    for campo, valor in (resumen.get("indicadores_clave") or {}).items():
+        campos[f"indicadores_clave.{campo}"] = str(valor or "")
+    return campos
+
+
+def _recortar_resumen(resumen: dict, max_tokens: int) -> dict:
+    campos = _campos_texto(resumen)
+    necesarios = sum(estimar_tokens(valor) for valor in campos.values())
+    factor = max_tokens / necesarios if necesarios else 1.0
+    recortado = {**resumen, "indicadores_clave": dict(resumen.get("indicadores_clave") or {})}
+    for campo, valor in campos.items():
+        limite = max(1, int(estimar_tokens(valor) * factor))
+        if campo == "resumen":
+            # Un texto sin resumir (análisis directo) conserva el inicio y el cierre
+            recortado["resumen"] = recortar_texto(valor, limite, fraccion_final=1 / 3)
+        else:
+            recortado["indicadores_clave"][campo.split(".", 1)[1]] = recortar_texto(valor, limite)
+    return recortado
+
+
+def ajustar_resumenes(resumenes: list, max_tokens: int = PROMPT_MAX_TOKENS_DOCUMENTOS) -> list:
+    """
+    Resúmenes que caben en `max_tokens` (copias: los originales pueden estar en caché).
+    Registra en el log la asignación elegida cuando hay que recortar.
+    """
+    if not max_tokens or not resumenes:
+        return resumenes
+    nombres = [f"{i}:{r.get('documento', 'Sin nombre')}" for i, r in enumerate(resumenes)]
+    roles = {nombre: rol_documento(r) for nombre, r in zip(nombres, resumenes)}
+    demandas = {
+        nombre: sum(estimar_tokens(valor) for valor in _campos_texto(r).values())
+        for nombre, r in zip(nombres, resumenes)
+    }
+    if sum(demandas.values()) <= max_tokens:
+        return resumenes
+
+    asignacion = asignar_presupuesto(demandas, {n: PESOS_ROL[roles[n]] for n in nombres}, max_tokens)
+    logger.info(
+        f"🧮 Prompt final: {sum(demandas.values())} tokens de documentos para {max_tokens} → "
+        + ", ".join(f"{n.split(':', 1)[1]} ({roles[n]}) {asignacion[n]}/{demandas[n]}" for n in nombres)
+    )
+    ajustados = []
+    for nombre, resumen in zip(nombres, resumenes):
+        if asignacion[nombre] < demandas[nombre]:
+            DOCUMENTOS_RECORTADOS.incrementar(rol=roles[nombre])
+            resumen = _recortar_resumen(resumen, asignacion[nombre])
+        ajustados.append(resumen)
+    return ajustados
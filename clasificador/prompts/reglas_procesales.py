@@ -0,0 +1,224 @@
+import re
+import unicodedata
+
+# 🧩 Extracción por reglas de los datos procesales (radicado, juzgado, ciudad, fecha)
+# Un único patrón precompilado recorre el texto una sola vez; se conserva la primera
+# coincidencia de cada campo (los encabezados del documento van primero).
+
+NO_SE_MENCIONA = "No se menciona en el texto."
+
+# Campos de la respuesta final (mismo orden que el formato pedido a Gemini)
+CAMPOS_FINALES = ("tipo_proceso", "partes_involucradas", "pretensiones", "hechos_relevantes",
+                  "normas_citadas", "juzgado_o_autoridad", "fecha_radicacion", "numero_radicado",
+                  "apoderados", "ciudad")
+CAMPOS_REGLAS = ("numero_radicado", "juzgado_o_autoridad", "ciudad", "fecha_radicacion")
+CAMPOS_MINIMOS_SOLO_REGLAS = ("numero_radicado", "juzgado_o_autoridad")
+
+# Código DANE (5 primeros dígitos del radicado) → ciudad sede del despacho
+CIUDADES_DANE = {
+    "11001": "Bogotá D.C.", "05001": "Medellín", "76001": "Cali", "08001": "Barranquilla",
+    "13001": "Cartagena", "68001": "Bucaramanga", "54001": "Cúcuta", "66001": "Pereira",
+    "17001": "Manizales", "73001": "Ibagué", "52001": "Pasto", "23001": "Montería",
+    "47001": "Santa Marta", "50001": "Villavicencio", "41001": "Neiva", "20001": "Valledupar",
+    "63001": "Armenia", "19001": "Popayán", "15001": "Tunja", "70001": "Sincelejo",
+    "18001": "Florencia", "27001": "Quibdó", "44001": "Riohacha", "81001": "Arauca",
+    "85001": "Yopal", "86001": "Mocoa", "88001": "San Andrés", "91001": "Leticia",
+    "94001": "Inírida", "95001": "San José del Guaviare", "97001": "Mitú", "99001": "Puerto Carreño",
+}
+
+_MESES = r"(?:enero|febrero|marzo|abril|mayo|junio|julio|agosto|septiembre|setiembre|octubre|noviembre|diciembre)"
+_FECHA = (
+    rf"\d{{1,2}}\s+de\s+{_MESES}\s+(?:de\s+|del\s+)?\d{{4}}"
+    r"|\d{1,2}[/-]\d{1,2}[/-]\d{4}"
+    r"|\d{4}-\d{2}-\d{2}"
+)
+_SEP = r"[\s.\-]?"
+
+# Palabras con las que termina el nombre del despacho (lo que sigue ya es otra cosa)
+_PALABRAS_FIN = (
+    r"radicado|radicaci[oó]n|rad|proceso|referencia|ref|expediente|asunto|demandante|demandado|"
+    r"accionante|accionado|auto|sentencia|mediante|que|el|la|los|las|se|con|a|en|fecha|no|n[°º]"
+)
+
+_MAYUSCULA = "A-ZÁÉÍÓÚÑÜ"
+
+# Primera palabra tras "Juzgado": ordinal, número o especialidad ("Quinto", "5°", "Civil",
+# "de Familia", "del Circuito"), con mayúscula inicial. "el juzgado admite..." no es un nombre
+_INICIO_JUZGADO = (
+    r"(?i:(?:de|del)\s+)?"
+    rf"(?=[{_MAYUSCULA}])(?i:(?:primer|segund|tercer|cuart|quint|sext|s[eé]ptim|octav|noven|d[eé]cim|"
+    r"und[eé]cim|duod[eé]cim|vig[eé]sim|trig[eé]sim|[uú]nic)[oa]?|primer|tercer|once|doce|trece|catorce|"
+    r"quince|dieci\w+|veinti\w+|treinta\w*|civil|penal|laboral|administrativo|familia|promiscuo|"
+    r"municipal|circuito|ejecuci[oó]n|peque[ñn]as|menores|agrario|especializado|adjunto|transitorio)\b"
+    r"|\d{1,3}[°º]?(?!\d)"
+)
+
+# Palabra del nombre del despacho: con mayúscula inicial (o toda en mayúsculas), conector
+# o número. Un punto solo se admite en abreviaturas ("D.C.", "D. C.", salvo que empiece
+# otra oración tras ellas) o si sigue en minúscula ("Mpal. de Cali"): el punto final de
+# la oración cierra el nombre ("...de Cali. Presentada el 12/03/2022")
+_PALABRA_AUTORIDAD = (
+    rf"[{_MAYUSCULA}][^\W\d_]{{0,2}}(?:\.\s?[^\W\d_]{{1,3}}\b)+(?:\.(?!\s+[{_MAYUSCULA}]))?"
+    rf"|[{_MAYUSCULA}][^\W\d_]*(?:\.(?=\s+[a-záéíóúñ]))?"
+    r"|(?:de|del|y)\b"
+    r"|\d{1,3}[°º]?"
+)
+
+# Solo las palabras clave ignoran mayúsculas (?i:...); los nombres capturados no:
+# "ciudad de residencia" o "el juzgado admite" no son una ciudad ni un despacho
+_PATRONES = {
+    # 23 dígitos: ciudad(5) entidad(2) especialidad(2) despacho(3) año(4) consecutivo(5) recurso(2)
+    "numero_radicado": (
+        rf"(?<!\d)\d{{5}}{_SEP}\d{{2}}{_SEP}\d{{2}}{_SEP}\d{{3}}{_SEP}(?:19|20)\d{{2}}{_SEP}\d{{5}}{_SEP}\d{{2}}(?!\d)"
+    ),
+    "juzgado_o_autoridad": (
+        rf"(?:(?i:\bjuzgado)(?=\s+(?:{_INICIO_JUZGADO}))"
+        r"|(?i:\b(?:tribunal\s+(?:superior|administrativo)|corte\s+(?:suprema|constitucional)|"
+        r"consejo\s+de\s+estado|comisi[oó]n\s+seccional\s+de\s+disciplina\s+judicial)))"
+        rf"(?:\s+(?!(?i:{_PALABRAS_FIN})\b)(?:{_PALABRA_AUTORIDAD})(?!\d)){{1,14}}"
+    ),
+    "fecha_radicacion": (
+        r"(?i:\b(?:fecha\s+de\s+radicaci[oó]n|radicad[oa]\s+(?:el|en\s+fecha)|presentad[oa]\s+el|"
+        r"fecha\s+de\s+reparto|repartid[oa]\s+el)\W{0,20}"
+        rf"(?:{_FECHA}))"
+    ),
+    "ciudad": (
+        rf"(?i:\b(?:en\s+la\s+ciudad\s+de|ciudad\s+de))\s+[{_MAYUSCULA}][\wáéíóúñ]+(?:\s+D\.?\s?C\.?)?"
+    ),
+}
+
+_PATRON = re.compile("|".join(f"(?P<{campo}>{patron})" for campo, patron in _PATRONES.items()))
+_FECHA_RE = re.compile(_FECHA, re.IGNORECASE)
+_RADICADO_RE = re.compile(_PATRONES["numero_radicado"])
+
+# Conectores que pueden quedar colgando al final del nombre del despacho
+_FIN_AUTORIDAD = re.compile(r"(?:\s+(?:de|del|y|en))+$", re.IGNORECASE)
+_DC = re.compile(r"\bD\.?\s?C\b\.?", re.IGNORECASE)
+_CONECTORES = {"de", "del", "la", "las", "los", "y", "en", "para", "con"}
+
+# Documento de trámite (auto) y no escrito de parte: candidato al modo solo reglas
+_AUTO = re.compile(r"\bauto\s+(?:interlocutorio|admisorio|de\s+sustanciaci[oó]n|que\s+admite|n[o°º.])", re.IGNORECASE)
+_RESUELVE = re.compile(r"\bresuelve\b", re.IGNORECASE)
+
+
+def _sin_tildes(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn").lower()
+
+
+_CIUDADES = {_sin_tildes(ciudad).replace(".", "").split(" dc")[0]: ciudad for ciudad in CIUDADES_DANE.values()}
+_CIUDADES["bogota"] = "Bogotá D.C."
+
+
+def _ciudad_conocida(texto: str):
+    """Ciudad sede mencionada en `texto` (p. ej. el nombre del juzgado), si es una capital conocida."""
+    normalizado = f" {_sin_tildes(texto).replace('.', '')} "
+    for clave, ciudad in _CIUDADES.items():
+        if f" {clave} " in normalizado or normalizado.rstrip().endswith(f" {clave}"):
+            return ciudad
+    return None
+
+
+def _normalizar_autoridad(texto: str) -> str:
+    # Sin el punto final ("D.C." lo recupera abajo) ni conectores colgando
+    texto = _FIN_AUTORIDAD.sub("", " ".join(texto.split()).rstrip(" ,;:.")).strip(" ,;:")
+    if texto.isupper():
+        palabras = texto.lower().split()
+        texto = " ".join(p if i and p in _CONECTORES else p.capitalize() for i, p in enumerate(palabras))
+    return _DC.sub("D.C.", texto)
+
+
+def _normalizar(campo: str, texto: str):
+    if campo == "numero_radicado":
+        return re.sub(r"\D", "", texto)
+    if campo == "juzgado_o_autoridad":
+        texto = _normalizar_autoridad(texto)
+        return texto if len(texto.split()) >= 2 else None
+    if campo == "fecha_radicacion":
+        return _FECHA_RE.search(texto).group(0)
+    if campo == "ciudad":
+        nombre = re.sub(r"^(?:en\s+la\s+)?ciudad\s+de\s+", "", texto, flags=re.IGNORECASE)
+        return _ciudad_conocida(nombre) or nombre
+    return texto
+
+
+def extraer_campos(texto: str) -> dict:
+    """Campos procesales encontrados en el texto: {campo: valor}; los ausentes no se incluyen."""
+    campos = {}
+    for coincidencia in _PATRON.finditer(texto):
+        campo = coincidencia.lastgroup
+        if campo in campos:
+            continue
+        valor = _normalizar(campo, coincidencia.group(0))
+        if valor:
+            campos[campo] = valor
+        if len(campos) == len(_PATRONES):
+            break
+
+    # La ciudad del radicado (código DANE) o la sede del juzgado prevalecen sobre menciones sueltas
+    ciudad = None
+    if "numero_radicado" in campos:
+        ciudad = CIUDADES_DANE.get(campos["numero_radicado"][:5])
+    if not ciudad and "juzgado_o_autoridad" in campos:
+        ciudad = _ciudad_conocida(campos["juzgado_o_autoridad"])
+    if ciudad:
+        campos["ciudad"] = ciudad
+    return campos
+
+
+def extraer_campos_documentos(documentos: dict) -> dict:
+    """Combina los campos de varios documentos; el primero que trae un campo lo define."""
+    campos = {}
+    for texto in documentos.values():
+        for campo, valor in extraer_campos(texto).items():
+            campos.setdefault(campo, valor)
+        if len(campos) == len(CAMPOS_REGLAS):
+            break
+    return campos
+
+
+def es_auto_simple(texto: str) -> bool:
+    """Auto judicial (encabezado de auto y parte resolutiva), sin escrito de demanda."""
+    return bool(_AUTO.search(texto[:3000]) and _RESUELVE.search(texto))
+
+
+def admite_solo_reglas(documentos: dict, campos: dict) -> bool:
+    """Un único auto del que las reglas ya sacaron radicado y despacho: Gemini no aporta más."""
+    if len(documentos) != 1 or not all(campos.get(c) for c in CAMPOS_MINIMOS_SOLO_REGLAS):
+        return False
+    return es_auto_simple(next(iter(documentos.values())))
+
+
+def radicado_valido(valor: str) -> bool:
+    """23 dígitos con la estructura del radicado (separadores aparte)."""
+    return bool(_RADICADO_RE.fullmatch(re.sub(r"\D", "", str(valor or ""))))
+
+
+def completar_resultado(resultado: dict, campos: dict) -> dict:
+    """
+    Prellena la respuesta de Gemini con los campos por reglas, solo donde el modelo no
+    los encontró. El radicado por reglas también reemplaza al del modelo si este no es
+    un radicado válido (dígitos de más o de menos).
+    """
+    if not resultado or not isinstance(resultado, dict) or "error" in resultado or not campos:
+        return resultado
+    destino = resultado.setdefault("campos", {})
+    if not isinstance(destino, dict):
+        return resultado
+    for campo, valor in campos.items():
+        actual = str(destino.get(campo) or "").strip()
+        falta = not actual or actual == NO_SE_MENCIONA
+        if falta or (campo == "numero_radicado" and not radicado_valido(actual)):
+            destino[campo] = valor
+    return resultado
+
+
+def resultado_solo_reglas(documentos: dict, campos: dict) -> dict:
+    """Respuesta con el formato final sin pasar por Gemini."""
+    es_auto = len(documentos) == 1 and es_auto_simple(next(iter(documentos.values())))
+    return {
+        "tipo_documento": "Auto" if es_auto else NO_SE_MENCIONA,
+        "clasificacion": NO_SE_MENCIONA,
+        "tipo_demanda": NO_SE_MENCIONA,
+        "campos": {campo: campos.get(campo, NO_SE_MENCIONA) for campo in CAMPOS_FINALES},
+        "fuente": "reglas",
+    }
@@ -0,0 +1,123 @@
+import json
+import os
+import re
+import logging
+import requests
+from clasificador.prompts.cliente_gemini import llamar_gemini
+from clasificador.utils.metricas import cronometro, Contador
+
+# 🧩 Salida estructurada de Gemini (responseMimeType + responseSchema)
+# Con el esquema el modelo devuelve JSON válido con los campos pedidos; si aun así no
+# parsea (salida cortada por max_output_tokens, p. ej.) se hace una única llamada de
+# reparación acotada en lugar de perder la llamada completa.
+GEMINI_SALIDA_ESTRUCTURADA = os.getenv("GEMINI_SALIDA_ESTRUCTURADA", "1") == "1"
+GEMINI_REPARACION_JSON = os.getenv("GEMINI_REPARACION_JSON", "1") == "1"
+GEMINI_TIMEOUT_REPARACION = float(os.getenv("GEMINI_TIMEOUT_REPARACION", "60"))
+GEMINI_REPARACION_MAX_CARACTERES = int(os.getenv("GEMINI_REPARACION_MAX_CARACTERES", "40000"))
+
+RESPUESTAS_JSON = Contador(
+    "clasificador_gemini_json_total",
+    "Respuestas de Gemini según su JSON: valido, reparado (tras la llamada de reparación) o fallido",
+    ("llamada", "resultado"),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def esquema_objeto(propiedades: dict) -> dict:
+    """Esquema OBJECT con todas las propiedades obligatorias y en el orden dado."""
+    return {
+        "type": "OBJECT",
+        "properties": propiedades,
+        "required": list(propiedades),
+        "propertyOrdering": list(propiedades),
+    }
+
+
+def esquema_textos(campos) -> dict:
+    return esquema_objeto({campo: {"type": "STRING"} for campo in campos})
+
+
+def configuracion_generacion(base: dict, esquema: dict) -> dict:
+    """generationConfig con el esquema de respuesta si la salida estructurada está activa."""
+    if not GEMINI_SALIDA_ESTRUCTURADA:
+        return base
+    return {**base, "responseMimeType": "application/json", "responseSchema": esquema}
+
+
+def texto_respuesta(response) -> str:
+    resultado = response.json()
+    return (
+        resultado.get("candidates", [{}])[0]
+        .get("content", {})
+        .get("parts", [{}])[0]
+        .get("text", "")
+    )
+
+
+def _cargar(texto: str):
+    """dict con el JSON del texto (admite bloques ```json y texto alrededor), o None."""
+    texto = re.sub(r"```json|```", "", str(texto or "")).strip()
+    candidatos = [texto]
+    inicio, fin = texto.find("{"), texto.rfind("}")
+    if 0 <= inicio < fin:
+        candidatos.append(texto[inicio:fin + 1])
+    for candidato in candidatos:
+        try:
+            datos = json.loads(candidato)
+        except ValueError:
+            continue
+        if isinstance(datos, dict):
+            return datos
+    return None
+
+
+def _reparar(texto: str, esquema: dict, api_key: str) -> str:
+    prompt = f"""
+El siguiente texto debía ser un JSON válido pero no se puede interpretar (comillas sin
+escapar, texto adicional o salida cortada). Devuélvelo corregido como un único objeto JSON
+con la estructura indicada. Conserva los valores tal como están; si un campo falta o quedó
+cortado, complétalo con "No se menciona en el texto.".
+
+ESTRUCTURA:
+{json.dumps(esquema, ensure_ascii=False)}
+
+TEXTO:
+{texto[:GEMINI_REPARACION_MAX_CARACTERES]}
+"""
+    response = llamar_gemini(
+        {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": configuracion_generacion({"temperature": 0, "max_output_tokens": 8192}, esquema),
+        },
+        api_key,
+        timeout=GEMINI_TIMEOUT_REPARACION,
+        llamada="reparacion",
+    )
+    response.raise_for_status()
+    return texto_respuesta(response)
+
+
+def interpretar_json(texto: str, esquema: dict, llamada: str, api_key: str) -> dict:
+    """
+    JSON de la respuesta del modelo. Si no parsea, una sola llamada de reparación.
+    Lanza ValueError si tampoco se obtiene un objeto JSON.
+    """
+    datos = _cargar(texto)
+    if datos is not None:
+        RESPUESTAS_JSON.incrementar(llamada=llamada, resultado="valido")
+        return datos
+
+    logger.warning(f"🧩 JSON inválido en la respuesta '{llamada}' ({len(texto or '')} caracteres)")
+    if GEMINI_REPARACION_JSON and api_key and (texto or "").strip():
+        with cronometro("json_reparacion", llamada):
+            try:
+                datos = _cargar(_reparar(texto, esquema, api_key))
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"🧩 Falló la llamada de reparación de JSON: {e}")
+        if datos is not None:
+            RESPUESTAS_JSON.incrementar(llamada=llamada, resultado="reparado")
+            return datos
+
+    RESPUESTAS_JSON.incrementar(llamada=llamada, resultado="fallido")
+    raise ValueError("La respuesta del modelo no es un JSON válido")
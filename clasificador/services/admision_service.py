@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from clasificador.utils.metricas import Contador, Medidor
+
+# 🧩 Control de admisión de /clasificar
+# Como máximo ADMISION_MAX_ACTIVAS peticiones procesan a la vez y ADMISION_MAX_COLA
+# esperan turno; por encima se rechaza de inmediato (429 + Retry-After) en lugar de
+# repartir la CPU entre todas y que la latencia se dispare para todos.
+ADMISION_MAX_ACTIVAS = int(os.getenv("ADMISION_MAX_ACTIVAS", "4"))
+ADMISION_MAX_COLA = int(os.getenv("ADMISION_MAX_COLA", "8"))
+ADMISION_ESPERA_MAX = float(os.getenv("ADMISION_ESPERA_MAX", "60"))  # segundos en cola antes de rechazar
+ADMISION_RETRY_AFTER = int(os.getenv("ADMISION_RETRY_AFTER", "15"))
+
+RECHAZOS_ADMISION = Contador(
+    "clasificador_admision_rechazos_total", "Peticiones rechazadas con 429 por falta de cupo", ("motivo",))
+
+
+class ServicioSaturado(Exception):
+    """No hay cupo para procesar la petición ni lugar en la cola de espera."""
+
+    def __init__(self, mensaje: str, retry_after: int = ADMISION_RETRY_AFTER):
+        super().__init__(mensaje)
+        self.retry_after = retry_after
+
+
+class ControlAdmision:
+    """Cupo de peticiones activas con una cola de espera acotada (por worker)."""
+
+    def __init__(self, max_activas: int, max_cola: int, espera_max: float):
+        self.max_activas = max(1, max_activas)
+        self.max_cola = max(0, max_cola)
+        self.espera_max = espera_max
+        self._condicion = threading.Condition()
+        self._activas = 0
+        self._en_cola = 0
+        self._contadores = {"admitidas": 0, "rechazadas_cola_llena": 0, "rechazadas_espera": 0}
+
+    @contextmanager
+    def admitir(self, esperar: bool = False):
+        """
+        Bloque con cupo reservado. Lanza ServicioSaturado si no se obtiene a tiempo.
+        Con `esperar` (casos de un lote) espera sin límite y cede el turno a las
+        peticiones que están en la cola.
+        """
+        if esperar:
+            self._esperar_cupo()
+        else:
+            self._reservar()
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._activas -= 1
+                # Todos: un caso de lote despertado puede volver a esperar y no tomar el cupo
+                self._condicion.notify_all()
+
+    def _esperar_cupo(self):
+        with self._condicion:
+            while self._activas >= self.max_activas or self._en_cola:
+                self._condicion.wait()
+            self._activas += 1
+            self._contadores["admitidas"] += 1
+
+    def _reservar(self):
+        with self._condicion:
+            if self._activas < self.max_activas and not self._en_cola:
+                self._activas += 1
+                self._contadores["admitidas"] += 1
+                return
+            if self._en_cola >= self.max_cola:
+                self._contadores["rechazadas_cola_llena"] += 1
+                RECHAZOS_ADMISION.incrementar(motivo="cola_llena")
+                raise ServicioSaturado("Cola de admisión llena")
+            self._en_cola += 1
+            limite = time.monotonic() + self.espera_max
+            try:
+                while self._activas >= self.max_activas:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._contadores["rechazadas_espera"] += 1
+                        RECHAZOS_ADMISION.incrementar(motivo="espera")
+                        raise ServicioSaturado("Tiempo de espera de admisión agotado")
+                    self._condicion.wait(restante)
+            finally:
+                self._en_cola -= 1
+            self._activas += 1
+            self._contadores["admitidas"] += 1
+
+    def estadisticas(self) -> dict:
+        with self._condicion:
+            return {**self._contadores, "activas": self._activas, "en_cola": self._en_cola,
+                    "max_activas": self.max_activas, "max_cola": self.max_cola}
+
+
+control_admision = ControlAdmision(ADMISION_MAX_ACTIVAS, ADMISION_MAX_COLA, ADMISION_ESPERA_MAX)
+
+SOLICITUDES_ADMITIDAS = Medidor(
+    "clasificador_admision_activas", "Peticiones admitidas en proceso",
+    funcion=lambda: control_admision.estadisticas()["activas"])
+SOLICITUDES_EN_ESPERA = Medidor(
+    "clasificador_admision_en_cola", "Peticiones esperando cupo de admisión",
+    funcion=lambda: control_admision.estadisticas()["en_cola"])
+
+
+def admitir_solicitud(esperar: bool = False):
+    return control_admision.admitir(esperar)
@@ -0,0 +1,221 @@
+from clasificador.services.clasificador_service import clasificar_archivo, archivo_permitido
+from clasificador.prompts.generador_prompt import generar_prompt, generar_resumenes
+from clasificador.prompts.fragmentador import estimar_tokens
+from clasificador.prompts.duplicados import agrupar_duplicados
+from clasificador.prompts.reglas_procesales import (
+    extraer_campos_documentos, admite_solo_reglas, completar_resultado, resultado_solo_reglas
+)
+from clasificador.utils.metricas import propagar_contexto, cronometro, Contador, Medidor
+from clasificador.utils.planificador import PlanificadorJusto, identificar_solicitud
+from clasificador.utils.conversor_texto import nucleos_disponibles, presupuesto_ocr_solicitud, paginas_sin_ocr
+from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import requests
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Un único documento más largo que esto se resume por fragmentos antes del análisis final
+ANALISIS_DIRECTO_MAX_TOKENS = int(os.getenv("ANALISIS_DIRECTO_MAX_TOKENS", "8000"))
+
+# Hilos de extracción compartidos por todas las peticiones del worker (antes, un pool por
+# petición). El trabajo pesado de OCR va al pool de procesos de conversor_texto.
+EXTRACCION_HILOS = int(os.getenv("EXTRACCION_HILOS", "0")) or max(4, nucleos_disponibles() * 2)
+planificador_extraccion = PlanificadorJusto(
+    lambda: ThreadPoolExecutor(max_workers=EXTRACCION_HILOS, thread_name_prefix="extraccion"),
+    EXTRACCION_HILOS,
+)
+EXTRACCIONES_EN_CURSO = Medidor(
+    "clasificador_extraccion_tareas_en_curso", "Archivos extrayéndose en el pool de extracción",
+    funcion=lambda: planificador_extraccion.estadisticas()["en_curso"])
+EXTRACCIONES_EN_ESPERA = Medidor(
+    "clasificador_extraccion_tareas_en_espera", "Archivos esperando turno en el pool de extracción",
+    funcion=lambda: planificador_extraccion.estadisticas()["en_espera"])
+
+# Campos procesales por reglas (radicado, juzgado, ciudad, fecha):
+#   prellenar (por defecto): completan la respuesta de Gemini
+#   auto: además, un único auto con radicado y despacho se responde sin llamar a Gemini
+#   solo: nunca se llama a Gemini
+REGLAS_MODO = os.getenv("REGLAS_MODO", "prellenar")
+
+CAMPOS_POR_REGLAS = Contador(
+    "clasificador_reglas_campos_total", "Campos procesales encontrados por reglas", ("campo",))
+RESPUESTAS_SOLO_REGLAS = Contador(
+    "clasificador_solo_reglas_total", "Casos respondidos solo con reglas, sin llamar a Gemini")
+DOCUMENTOS_DUPLICADOS = Contador(
+    "clasificador_documentos_duplicados_total", "Documentos descartados por duplicar a otro del mismo caso")
+
+#Extraccion del texto
+
+def procesar_archivo(archivo):
+    """Extrae el texto de un archivo subido. Devuelve (nombre, texto) o (None, None)."""
+
+    nombre_archivo = secure_filename(archivo.filename)
+    inicio = time.time() #Inicio de medicion individual
+    try:
+        # Ejecuta el clasificador de servicio
+        resultado = clasificar_archivo(archivo)
+
+        #Validar estructura del resultado
+        if not isinstance(resultado, dict):
+            raise ValueError("La funcion clasificar_archivo no devolvio un diccionario válido")
+
+        #Validar archivo permitido
+        if not archivo_permitido(archivo.filename, archivo.mimetype):
+            logger.warning(f"Archivo no permitido o con tipo inválido: {archivo.filename}")
+
+        if not resultado.get("exito"):
+            logger.warning(f"⚠️ {nombre_archivo}: {resultado.get('mensaje', 'Sin mensaje')}")
+            return None, None
+
+        texto_extraido = resultado.get("texto", "")
+
+        if not texto_extraido or len(texto_extraido.strip()) == 0:
+            logger.warning(f"⚠️ {nombre_archivo}: Texto vacío o ilegible.")
+
+        duracion = round(time.time() - inicio, 2)
+        logger.info(f"✅ Texto extraído correctamente de {nombre_archivo} en {duracion}s")
+        return nombre_archivo, texto_extraido
+
+    except ValueError as ve:
+        logger.warning(f"⚠️ {archivo.filename}: {ve}")
+    except Exception as e:
+        logger.error(f"❌ Error extrayendo texto de {archivo.filename}: {e}")
+    finally:
+        fin = time.time()
+        logger.info(f"⏱️ Tiempo total {nombre_archivo}: {round(fin - inicio, 2)}s")
+
+    return None, None
+
+
+def _procesar_medido(archivo) -> tuple:
+    inicio = time.perf_counter()
+    nombre, texto = procesar_archivo(archivo)
+    return nombre, texto, time.perf_counter() - inicio
+
+
+def _informar(resultado, **anotaciones):
+    # documentos_fusionados: {conservado: [descartados]}; paginas_sin_ocr: {archivo: "12-80, 95"}
+    if isinstance(resultado, dict):
+        resultado.update({clave: valor for clave, valor in anotaciones.items() if valor})
+    return resultado
+
+
+def ejecutar_clasificacion(archivos, progreso=None) -> tuple:
+    """
+    Ejecuta el flujo completo (extracción + Gemini) sobre los archivos de un caso.
+    Devuelve (cuerpo_respuesta, codigo_http).
+    `progreso(evento, **datos)` se llama, desde este mismo hilo, al terminar cada
+    extracción y cada resumen (ver progreso_service).
+    """
+    progreso = progreso or (lambda evento, **datos: None)
+    documentos ={}
+
+    # 🧠 Ejecutar extracción en paralelo, por turnos con las demás peticiones y con un
+    # presupuesto de páginas de OCR común a todos los archivos del caso
+    with identificar_solicitud(), presupuesto_ocr_solicitud():
+        futures = {
+            planificador_extraccion.enviar(propagar_contexto(_procesar_medido), archivo): archivo
+            for archivo in archivos
+        }
+    for future in as_completed(futures):
+        nombre, texto, segundos = future.result()
+        progreso(
+            "extraccion",
+            archivo=futures[future].filename,
+            exito=bool(nombre and texto),
+            segundos=round(segundos, 3),
+            caracteres=len(texto or ""),
+        )
+    # En el orden en que llegaron los archivos (las reglas toman el primer documento que trae cada campo)
+    for future in futures:
+        nombre, texto, _ = future.result()
+        if nombre and texto:
+            documentos[nombre] = texto
+
+    if not documentos:
+        return {'error': 'No se pudo procesar ningún archivo válido'}, 400
+
+    sin_ocr = {}
+    for nombre, texto in documentos.items():
+        rangos = paginas_sin_ocr(texto)
+        if rangos:
+            sin_ocr[nombre] = rangos
+
+    # 🧬 Copias exactas o casi exactas (mismo PDF renombrado, re-escaneo): se resume solo la más completa
+    with cronometro("duplicados"):
+        documentos, fusionados = agrupar_duplicados(documentos)
+    if fusionados:
+        descartados = sum(len(nombres) for nombres in fusionados.values())
+        DOCUMENTOS_DUPLICADOS.incrementar(descartados)
+        logger.info(f"🧬 {descartados} documentos duplicados fusionados: {fusionados}")
+        progreso("duplicados", fusionados=fusionados)
+
+    with cronometro("reglas"):
+        campos_reglas = extraer_campos_documentos(documentos)
+    for campo in campos_reglas:
+        CAMPOS_POR_REGLAS.incrementar(campo=campo)
+
+    if REGLAS_MODO == "solo" or (REGLAS_MODO == "auto" and admite_solo_reglas(documentos, campos_reglas)):
+        logger.info(f"📏 Respuesta solo con reglas ({len(documentos)} documentos)")
+        RESPUESTAS_SOLO_REGLAS.incrementar()
+        return _informar(resultado_solo_reglas(documentos, campos_reglas),
+                         documentos_fusionados=fusionados, paginas_sin_ocr=sin_ocr), 200
+
+    #Llamada a GEMINI (1 o mas archivos)
+
+    try:
+
+        nombre, texto = list(documentos.items())[0]
+        if len(documentos) == 1 and estimar_tokens(texto) <= ANALISIS_DIRECTO_MAX_TOKENS:
+            # Solo un archivo → análisis directo
+            logger.info(f"📄 Análisis directo para: {nombre}")
+            resultado_final = generar_prompt([{
+                "documento": nombre,
+                "resumen": texto,
+                "tipo_documento": "Desconocido",
+                "indicadores_clave": {}
+            }])
+        else:
+            # Varios archivos o uno muy largo → resúmenes (por fragmentos si hace falta) + análisis final
+            logger.info(f"📚 Analizando {len(documentos)} documentos del mismo proceso")
+            resumenes = generar_resumenes(documentos, progreso)
+            resultado_final = generar_prompt(resumenes)
+
+    except requests.exceptions.RequestException as re:
+        logger.error(f"🌐 Error de red al llamar a la API de Gemini: {re}")
+        return {
+            "error": "Error de conexión con el modelo de IA",
+            "detalle": str(re)
+        }, 503 # Servicio no disponible
+
+    except Exception as e:
+        logger.error(f"❌ Error en la llamada al modelo Gemini: {e}")
+        return {
+            "error": "Error al generar la respuesta con Gemini",
+            "detalle": str(e)
+        }, 502 #Bad Gateway (error del modelo)
+
+    # Validacion y parseo de respuesta
+
+    resultado_final = completar_resultado(resultado_final, campos_reglas)
+
+    if not resultado_final:
+        return {
+            "error": "Respuesta vacía del modelo de IA",
+        }, 502
+
+    if isinstance(resultado_final,dict) and "error" in resultado_final:
+        #Error interno desde generador_prompt.py
+        logger.error(f"⚠️ Error en la respuesta del modelo: {resultado_final['error']}")
+        return {
+            "error": "Ocurrió un problema al interpretar la respuesta de modelo",
+            "detalle": resultado_final["error"]
+        }, 502
+
+    #Respuesta exitosa
+
+    logger.info("✅ Proceso completado exitosamente")
+    return _informar(resultado_final, documentos_fusionados=fusionados, paginas_sin_ocr=sin_ocr), 200
@@ -1,5 +1,11 @@
 from pathlib import Path
-from clasificador.utils.conversor_texto import extraer_texto_auto
+from clasificador.utils.conversor_texto import extraer_texto_auto, es_error_extraccion, es_extraccion_parcial
+from clasificador.utils.cache_extraccion import clave_extraccion, huella_archivo, obtener_texto, guardar_texto
+from clasificador.utils.normalizador_texto import normalizar_texto
+from clasificador.utils.metricas import cronometro, CARACTERES_EXTRAIDOS, CARACTERES_NORMALIZADOS
+import logging
+
+logger = logging.getLogger(__name__)
 
 EXTENSIONES_SOPORTADAS = ['.pdf', '.jpg', '.jpeg', '.png', '.doc', '.docx', '.xls', '.xlsx']
 MIMES_SOPORTADAS = [
@@ -21,12 +27,13 @@ def clasificar_archivo(archivo) -> dict:
 
     """
     Procesa un archivo adjunto, detecta el tipo y extrae su texto.
+    Si el archivo ya está volcado a disco (ArchivoEnDisco) se lee desde su ruta.
     Devuelve un dict con el resultado estructurado.
     """
 
     try:
         nombre_archivo = Path(archivo.filename).name
-        contenido = archivo.read()
+        contenido = getattr(archivo, "ruta", None) or archivo.read()
         extension = Path(archivo.filename).suffix.lower()
 
         if extension not in EXTENSIONES_SOPORTADAS:
@@ -37,9 +44,40 @@ def clasificar_archivo(archivo) -> dict:
                 "texto": ""
             }
         
+        #Caché por contenido: si el archivo ya se procesó, se omite la extracción
+
+        with cronometro("cache_extraccion", extension.lstrip(".")):
+            # El SHA-256 del contenido se calcula una vez: también lo usa la caché de páginas de OCR
+            huella = huella_archivo(contenido)
+            clave = clave_extraccion(nombre_archivo, contenido, huella)
+            texto = obtener_texto(clave)
+        if texto is not None:
+            return {
+                "nombre": nombre_archivo,
+                "exito": True,
+                "mensaje": "Texto recuperado de caché.",
+                "texto": texto,
+                "cache": True
+            }
+
         #Extracción automática optimizada
 
-        texto = extraer_texto_auto(nombre_archivo, contenido)
+        with cronometro("extraccion", extension.lstrip(".")):
+            texto = extraer_texto_auto(nombre_archivo, contenido, huella)
+        CARACTERES_EXTRAIDOS.incrementar(len(texto), tipo=extension.lstrip("."))
+
+        #Normalización: encabezados y pies repetidos, ruido de OCR y espacios de relleno
+
+        caracteres_originales = len(texto)
+        if texto.strip() and not es_error_extraccion(texto):
+            with cronometro("normalizacion", extension.lstrip(".")):
+                texto, estadisticas = normalizar_texto(texto)
+            CARACTERES_NORMALIZADOS.incrementar(len(texto), tipo=extension.lstrip("."))
+            logger.info(
+                f"🧹 {nombre_archivo}: {estadisticas['caracteres_antes']} → {estadisticas['caracteres_despues']} "
+                f"caracteres ({estadisticas['lineas_repetidas']} líneas repetidas, "
+                f"{estadisticas['tokens_ruido']} tokens de ruido)"
+            )
 
         if not texto.strip():
             return{
@@ -48,11 +86,18 @@ def clasificar_archivo(archivo) -> dict:
                 "mensaje": "No se pudo extraer texto del archivo.",
                 "texto": ""
             }
+        # Un texto con páginas sin OCR por presupuesto no se guarda: otra petición con más
+        # presupuesto lo completa (las páginas ya leídas salen de la caché de páginas)
+        if not es_error_extraccion(texto) and not es_extraccion_parcial(texto):
+            guardar_texto(clave, texto)
+
         return{
             "nombre": nombre_archivo,
             "exito": True,
             "mensaje": "Texto extraido correctamente.",
-            "texto": texto
+            "texto": texto,
+            "caracteres_originales": caracteres_originales,
+            "cache": False
         }
 
     except Exception as e:
@@ -0,0 +1,136 @@
+import atexit
+import os
+import queue
+import threading
+import logging
+import requests
+from clasificador.utils.metricas import Medidor
+
+# 🧩 Notificaciones a dispersión en segundo plano
+# La ruta de clasificación solo encola; un hilo del worker envía lo acumulado cada
+# DISPERSION_INTERVALO. El servicio de dispersión recibe un registro por llamada: un "lote"
+# son hasta DISPERSION_LOTE POST seguidos sobre la misma conexión, no una única petición.
+DISPERSION_URL = os.getenv("DISPERSION_URL", "https://dispersion-718759852530.us-central1.run.app/dispersion")
+DISPERSION_TIMEOUT = float(os.getenv("DISPERSION_TIMEOUT", "5"))
+DISPERSION_MAX_COLA = int(os.getenv("DISPERSION_MAX_COLA", "1000"))
+DISPERSION_LOTE = int(os.getenv("DISPERSION_LOTE", "50"))
+DISPERSION_INTERVALO = float(os.getenv("DISPERSION_INTERVALO", "2"))
+DISPERSION_ESPERA_CIERRE = float(os.getenv("DISPERSION_ESPERA_CIERRE", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+class EnviadorDispersion:
+    """
+    Cola acotada + hilo enviador. Si la cola está llena la notificación se descarta
+    y se contabiliza; nunca se bloquea a quien notifica.
+    """
+
+    def __init__(self):
+        self._cola = queue.Queue(maxsize=DISPERSION_MAX_COLA)
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self._sesion = None
+        self._contadores = {"encoladas": 0, "enviadas": 0, "fallidas": 0, "descartadas": 0}
+
+    def _contar(self, campo: str, cantidad: int = 1):
+        with self._lock:
+            self._contadores[campo] += cantidad
+
+    def _asegurar_hilo(self):
+        # El hilo se crea en el primer uso de cada worker (no sobrevive al fork)
+        with self._lock:
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            self._cola = queue.Queue(maxsize=DISPERSION_MAX_COLA)
+            self._detener = threading.Event()
+            self._sesion = requests.Session()
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._bucle, name="dispersion", daemon=True)
+            self._hilo.start()
+
+    def notificar(self, url_cliente, funcion):
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait({"url": url_cliente, "funcion": funcion})
+            self._contar("encoladas")
+        except queue.Full:
+            self._contar("descartadas")
+            logger.warning("⚠️ Cola de dispersión llena, notificación descartada")
+
+    def _tomar_lote(self, espera: float) -> list:
+        try:
+            lote = [self._cola.get(timeout=espera)]
+        except queue.Empty:
+            return []
+        while len(lote) < DISPERSION_LOTE:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _enviar(self, lote: list):
+        """
+        Un POST por registro (el endpoint no acepta varios por llamada). Lo único que
+        comparte el lote es la conexión keep-alive de la sesión, fuera de la petición.
+        """
+        for data in lote:
+            try:
+                response = self._sesion.post(DISPERSION_URL, json=data, timeout=DISPERSION_TIMEOUT)
+                if response.status_code == 200:
+                    self._contar("enviadas")
+                else:
+                    self._contar("fallidas")
+                    logger.warning(f"Error en dispersión: {response.status_code} - {response.text[:200]}")
+            except requests.exceptions.RequestException as e:
+                self._contar("fallidas")
+                logger.warning(f"Error en dispersión: {e}")
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            lote = self._tomar_lote(DISPERSION_INTERVALO)
+            if lote:
+                self._enviar(lote)
+        # Vaciado final al cerrar el worker
+        while True:
+            lote = self._tomar_lote(0)
+            if not lote:
+                break
+            self._enviar(lote)
+
+    def detener(self, espera: float = DISPERSION_ESPERA_CIERRE):
+        """Envía lo pendiente y detiene el hilo (se llama al cerrar el worker)."""
+        if self._hilo is None or self._pid != os.getpid():
+            return
+        self._detener.set()
+        self._hilo.join(timeout=espera)
+        pendientes = self._cola.qsize()
+        if pendientes:
+            self._contar("descartadas", pendientes)
+            logger.warning(f"⚠️ {pendientes} notificaciones de dispersión sin enviar al cerrar")
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            datos = dict(self._contadores)
+        datos["en_cola"] = self._cola.qsize()
+        return datos
+
+
+enviador = EnviadorDispersion()
+atexit.register(enviador.detener)
+
+COLA_DISPERSION = Medidor(
+    "clasificador_dispersion_en_cola", "Notificaciones a dispersión pendientes de envío",
+    funcion=lambda: enviador.estadisticas()["en_cola"])
+
+
+def notificar_dispersion(url_cliente, funcion):
+    """Encola el registro en dispersión sin bloquear la petición."""
+    enviador.notificar(url_cliente, funcion)
+
+
+def estadisticas_dispersion() -> dict:
+    return enviador.estadisticas()
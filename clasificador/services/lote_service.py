@@ -0,0 +1,205 @@
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from clasificador.services.admision_service import admitir_solicitud
+from clasificador.services.clasificacion_service import ejecutar_clasificacion
+from clasificador.utils.archivos_temporales import LoteTemporal, SPOOL_DIR, volcar_archivos
+from clasificador.utils.metricas import medir_solicitud
+
+# 🧩 Clasificación por lotes: muchos casos en una sola subida, resultados en NDJSON
+# Solo LOTE_CASOS_PARALELOS casos están en disco y en proceso a la vez; el resto espera
+# como una descripción (nombres de archivo y url), así la memoria no crece con el lote.
+# Cada caso ocupa un cupo de admisión mientras se procesa, como una petición a /clasificar.
+LOTE_MAX_BYTES = int(os.getenv("LOTE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))  # tamaño de la subida
+LOTE_MAX_CASOS = int(os.getenv("LOTE_MAX_CASOS", "5000"))
+LOTE_CASOS_PARALELOS = int(os.getenv("LOTE_CASOS_PARALELOS", "4"))
+LOTE_MAX_BYTES_ARCHIVO = int(os.getenv("LOTE_MAX_BYTES_ARCHIVO", str(100 * 1024 * 1024)))  # descomprimido
+
+MANIFIESTO_ZIP = "manifiesto.json"
+URL_ZIP = "url.txt"
+_CAMPO_MULTIPART = re.compile(r"^(archivos|url)\[(.+)\]$")
+
+logger = logging.getLogger(__name__)
+
+
+class LoteInvalido(Exception):
+    """La subida no describe casos válidos."""
+
+
+def _caso(id_caso: str, url: str, preparar) -> dict:
+    # `preparar` vuelca los archivos del caso a disco y devuelve su LoteTemporal
+    return {"caso": id_caso, "url": url, "preparar": preparar}
+
+
+# 🔹 Multipart: archivos[<caso>] (uno o varios) y url[<caso>]; `url` aplica a todos
+
+def casos_multipart(archivos, formulario, recursos) -> list:
+    """
+    Los archivos se vuelcan a disco ya aquí: werkzeug cierra los de la petición al
+    responder, antes de que termine el streaming. `recursos` (ExitStack) los borra
+    al cerrar la respuesta; cada caso borra los suyos en cuanto termina.
+    """
+    url_defecto = formulario.get("url")
+    casos, urls = {}, {}
+    for campo, subidos in archivos.lists():
+        coincidencia = _CAMPO_MULTIPART.match(campo)
+        if coincidencia and coincidencia.group(1) == "archivos":
+            casos.setdefault(coincidencia.group(2), []).extend(subidos)
+    for campo, valor in formulario.items():
+        coincidencia = _CAMPO_MULTIPART.match(campo)
+        if coincidencia and coincidencia.group(1) == "url":
+            urls[coincidencia.group(2)] = valor
+    resultado = []
+    for id_caso, subidos in casos.items():
+        lote = volcar_archivos(subidos)
+        recursos.callback(lote.limpiar)
+        resultado.append(_caso(id_caso, urls.get(id_caso) or url_defecto, lambda lote=lote: lote))
+    return resultado
+
+
+# 🔹 Zip: una carpeta por caso (con url.txt opcional) o un manifiesto.json en la raíz:
+#     [{"caso": "...", "url": "...", "archivos": ["carpeta/demanda.pdf", ...]}, ...]
+
+@contextmanager
+def abrir_zip(flujo):
+    """Vuelca el zip subido a un temporal (por bloques) y lo abre; se borra al salir."""
+    with tempfile.NamedTemporaryFile(prefix="lote_", suffix=".zip", dir=SPOOL_DIR) as temporal:
+        shutil.copyfileobj(flujo, temporal, 1024 * 1024)
+        temporal.flush()
+        with zipfile.ZipFile(temporal.name) as zf:
+            yield zf
+
+
+def _ignorado(nombre: str) -> bool:
+    partes = nombre.split("/")
+    return partes[0] == "__MACOSX" or any(parte.startswith(".") for parte in partes)
+
+
+def _extraer_miembros(zf: zipfile.ZipFile, miembros: list) -> LoteTemporal:
+    lote = LoteTemporal()
+    try:
+        for info in miembros:
+            if info.file_size > LOTE_MAX_BYTES_ARCHIVO:
+                raise LoteInvalido(f"{info.filename} supera {LOTE_MAX_BYTES_ARCHIVO} bytes descomprimido")
+            nombre = posixpath.basename(info.filename)
+            with zf.open(info) as flujo:
+                lote.agregar_flujo(nombre, mimetypes.guess_type(nombre)[0], flujo)
+    except Exception:
+        lote.limpiar()
+        raise
+    return lote
+
+
+def casos_zip(zf: zipfile.ZipFile, url_defecto: str = None) -> list:
+    miembros = {i.filename: i for i in zf.infolist() if not i.is_dir() and not _ignorado(i.filename)}
+
+    def preparar(infos):
+        return lambda: _extraer_miembros(zf, infos)
+
+    if MANIFIESTO_ZIP in miembros:
+        try:
+            entradas = json.loads(zf.read(MANIFIESTO_ZIP).decode("utf-8"))
+            return [
+                _caso(str(e["caso"]), e.get("url") or url_defecto, preparar([miembros[n] for n in e["archivos"]]))
+                for e in entradas
+            ]
+        except (ValueError, KeyError, TypeError) as e:
+            raise LoteInvalido(f"{MANIFIESTO_ZIP} inválido: {e}")
+
+    # url.txt en la raíz: url por defecto de las carpetas que no traen la suya
+    if URL_ZIP in miembros:
+        url_defecto = zf.read(miembros.pop(URL_ZIP)).decode("utf-8").strip() or url_defecto
+
+    carpetas = {}
+    for nombre, info in miembros.items():
+        carpeta = nombre.split("/", 1)[0] if "/" in nombre else ""
+        carpetas.setdefault(carpeta, []).append(info)
+    casos = []
+    for carpeta, infos in carpetas.items():
+        url = url_defecto
+        ruta_url = posixpath.join(carpeta, URL_ZIP)
+        if carpeta and ruta_url in miembros:
+            url = zf.read(ruta_url).decode("utf-8").strip() or url_defecto
+            infos = [info for info in infos if info.filename != ruta_url]
+        casos.append(_caso(carpeta or "raiz", url, preparar(infos)))
+    return casos
+
+
+# 🔹 Ejecución con los casos solapados (extracción de unos mientras otros esperan a Gemini)
+
+def _procesar_caso(caso: dict) -> dict:
+    inicio = time.perf_counter()
+    # Espera su cupo en lugar de fallar con 429: el lote ya fue aceptado
+    with admitir_solicitud(esperar=True), medir_solicitud("lote") as medicion:
+        try:
+            if not caso["url"]:
+                resultado, codigo = {"error": "URL del cliente no recibida"}, 400
+            else:
+                with caso["preparar"]() as lote:
+                    if not lote.archivos:
+                        resultado, codigo = {"error": "No se recibieron archivos"}, 400
+                    else:
+                        resultado, codigo = ejecutar_clasificacion(lote.archivos)
+        except LoteInvalido as e:
+            resultado, codigo = {"error": str(e)}, 400
+        except MemoryError:
+            logger.critical(f"💥 Error de memoria en el caso {caso['caso']}")
+            resultado, codigo = {"error": "El servidor no tiene suficiente memoria para procesar este archivo."}, 413
+        except Exception as e:
+            logger.exception(f"❌ Error en el caso {caso['caso']}")
+            resultado, codigo = {"error": "Error interno del servidor", "detalle": str(e)}, 500
+        medicion["codigo"] = codigo
+    return {
+        "caso": caso["caso"],
+        "url": caso["url"],
+        "codigo": codigo,
+        "resultado": resultado,
+        "duracion_s": round(time.perf_counter() - inicio, 2),
+    }
+
+
+def clasificar_casos(casos: list):
+    """Genera el resultado de cada caso en cuanto termina (no en el orden de entrada)."""
+    pendientes = iter(casos)
+    executor = ThreadPoolExecutor(max_workers=LOTE_CASOS_PARALELOS, thread_name_prefix="lote")
+    en_curso = set()
+    try:
+        for caso in pendientes:
+            en_curso.add(executor.submit(_procesar_caso, caso))
+            if len(en_curso) >= LOTE_CASOS_PARALELOS:
+                break
+        while en_curso:
+            terminados, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+            for future in terminados:
+                siguiente = next(pendientes, None)
+                if siguiente is not None:
+                    en_curso.add(executor.submit(_procesar_caso, siguiente))
+                yield future.result()
+    finally:
+        # Si el cliente se desconecta, no se empiezan más casos
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def lineas_ndjson(casos: list):
+    """Una línea JSON por caso terminado y una línea final con el resumen del lote."""
+    codigos = Counter()
+    inicio = time.perf_counter()
+    for resultado in clasificar_casos(casos):
+        codigos[resultado["codigo"]] += 1
+        yield json.dumps(resultado, ensure_ascii=False) + "\n"
+    yield json.dumps({
+        "fin": True,
+        "casos": sum(codigos.values()),
+        "codigos": {str(codigo): n for codigo, n in sorted(codigos.items())},
+        "duracion_s": round(time.perf_counter() - inicio, 2),
+    }, ensure_ascii=False) + "\n"
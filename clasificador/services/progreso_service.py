@@ -0,0 +1,83 @@
+import json
+import os
+import queue
+import threading
+import logging
+from clasificador.services.clasificacion_service import ejecutar_clasificacion
+from clasificador.utils.metricas import medir_solicitud
+
+# 🧩 Progreso de /clasificar en streaming (SSE o NDJSON)
+# La clasificación corre en un hilo propio y publica eventos en una cola; la respuesta
+# los reenvía a medida que llegan y manda latidos para que proxies y clientes no corten.
+PROGRESO_LATIDO = float(os.getenv("PROGRESO_LATIDO", "15"))  # segundos sin eventos antes de un latido
+
+SSE = "sse"
+NDJSON = "ndjson"
+MIMETYPES = {SSE: "text/event-stream", NDJSON: "application/x-ndjson"}
+
+logger = logging.getLogger(__name__)
+
+_FIN = object()
+
+
+def formato_progreso(parametro: str, accept) -> str:
+    """Formato pedido con ?progreso=sse|ndjson o por Accept; None = respuesta normal."""
+    if parametro:
+        return parametro.lower() if parametro.lower() in MIMETYPES else None
+    mejor = accept.best_match(["application/json", MIMETYPES[SSE], MIMETYPES[NDJSON]])
+    return {MIMETYPES[SSE]: SSE, MIMETYPES[NDJSON]: NDJSON}.get(mejor)
+
+
+def _formatear(formato: str, evento: str, datos: dict) -> str:
+    cuerpo = json.dumps(datos, ensure_ascii=False)
+    if formato == SSE:
+        return f"event: {evento}\ndata: {cuerpo}\n\n"
+    return json.dumps({"evento": evento, **datos}, ensure_ascii=False) + "\n"
+
+
+def _latido(formato: str) -> str:
+    return ": latido\n\n" if formato == SSE else json.dumps({"evento": "latido"}) + "\n"
+
+
+def clasificar_con_progreso(archivos, recursos, formato: str):
+    """
+    Lanza la clasificación en segundo plano y devuelve el generador de eventos.
+    `recursos` (ExitStack con el cupo de admisión y los archivos en disco) lo cierra
+    el hilo al terminar, aunque el cliente se haya desconectado antes.
+    """
+    cola = queue.Queue()
+
+    def publicar(evento: str, **datos):
+        cola.put((evento, datos))
+
+    def ejecutar():
+        try:
+            with recursos, medir_solicitud("clasificar") as medicion:
+                publicar("inicio", archivos=[archivo.filename for archivo in archivos])
+                try:
+                    resultado, codigo = ejecutar_clasificacion(archivos, publicar)
+                except MemoryError:
+                    logger.critical("💥 Error de memoria: el archivo o el texto son demasiado grandes.")
+                    resultado, codigo = {"error": "El servidor no tiene suficiente memoria para procesar este archivo."}, 413
+                except Exception as e:
+                    logger.exception("❌ ERROR INTERNO DEL SERVIDOR ❌")
+                    resultado, codigo = {"error": "Error interno del servidor", "detalle": str(e)}, 500
+                medicion["codigo"] = codigo
+                publicar("resultado", codigo=codigo, resultado=resultado)
+        finally:
+            cola.put(_FIN)
+
+    threading.Thread(target=ejecutar, name="clasificar-progreso", daemon=True).start()
+
+    def eventos():
+        while True:
+            try:
+                elemento = cola.get(timeout=PROGRESO_LATIDO)
+            except queue.Empty:
+                yield _latido(formato)
+                continue
+            if elemento is _FIN:
+                return
+            yield _formatear(formato, *elemento)
+
+    return eventos()
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from clasificador.services.clasificacion_service import ejecutar_clasificacion
+from clasificador.utils.archivos_temporales import volcar_archivos
+from clasificador.utils.sqlite_local import ConexionesSQLite
+from clasificador.utils.metricas import Medidor, medir_solicitud
+
+# 🧩 Trabajos asíncronos de clasificación (submit/poll)
+# TRABAJOS_ALMACEN=memoria (por defecto) | sqlite (varios workers de gunicorn, TRABAJOS_DB)
+TRABAJOS_ALMACEN = os.getenv("TRABAJOS_ALMACEN", "memoria")
+TRABAJOS_DB = os.getenv("TRABAJOS_DB", "/tmp/clasificador_trabajos.db")
+TRABAJOS_MAX_WORKERS = int(os.getenv("TRABAJOS_MAX_WORKERS", "2"))
+TRABAJOS_MAX_PENDIENTES = int(os.getenv("TRABAJOS_MAX_PENDIENTES", "50"))
+TRABAJOS_TTL = int(os.getenv("TRABAJOS_TTL", "3600"))  # segundos que se conserva un trabajo terminado
+
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+FALLIDO = "error"
+
+logger = logging.getLogger(__name__)
+
+
+class ColaTrabajosLlena(Exception):
+    """Se alcanzó el máximo de trabajos pendientes."""
+
+
+class AlmacenTrabajosMemoria:
+    """Estado de los trabajos en el propio proceso (un solo worker)."""
+
+    def __init__(self):
+        self._trabajos = {}
+        self._lock = threading.Lock()
+
+    def guardar(self, trabajo: dict):
+        with self._lock:
+            self._trabajos[trabajo["id"]] = dict(trabajo)
+
+    def obtener(self, id_trabajo: str):
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            return dict(trabajo) if trabajo else None
+
+    def purgar(self, antes_de: float):
+        with self._lock:
+            vencidos = [
+                id_trabajo for id_trabajo, t in self._trabajos.items()
+                if t["estado"] in (COMPLETADO, FALLIDO) and t["actualizado"] < antes_de
+            ]
+            for id_trabajo in vencidos:
+                del self._trabajos[id_trabajo]
+
+
+class AlmacenTrabajosSQLite:
+    """Estado de los trabajos en SQLite, visible para todos los workers de la instancia."""
+
+    def __init__(self, ruta: str):
+        self._conexiones = ConexionesSQLite(ruta)
+        self._conexiones.ejecutar_ddl(
+            "CREATE TABLE IF NOT EXISTS trabajos ("
+            "id TEXT PRIMARY KEY, estado TEXT NOT NULL, actualizado REAL NOT NULL, datos TEXT NOT NULL)"
+        )
+
+    def guardar(self, trabajo: dict):
+        with self._conexiones.obtener() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO trabajos (id, estado, actualizado, datos) VALUES (?, ?, ?, ?)",
+                (trabajo["id"], trabajo["estado"], trabajo["actualizado"], json.dumps(trabajo, ensure_ascii=False)),
+            )
+
+    def obtener(self, id_trabajo: str):
+        fila = self._conexiones.obtener().execute(
+            "SELECT datos FROM trabajos WHERE id = ?", (id_trabajo,)
+        ).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def purgar(self, antes_de: float):
+        with self._conexiones.obtener() as con:
+            con.execute(
+                "DELETE FROM trabajos WHERE estado IN (?, ?) AND actualizado < ?",
+                (COMPLETADO, FALLIDO, antes_de),
+            )
+
+
+def _crear_almacen():
+    if TRABAJOS_ALMACEN == "sqlite":
+        return AlmacenTrabajosSQLite(TRABAJOS_DB)
+    return AlmacenTrabajosMemoria()
+
+
+almacen = _crear_almacen()
+
+_executor = ThreadPoolExecutor(max_workers=TRABAJOS_MAX_WORKERS, thread_name_prefix="trabajo")
+_pendientes = threading.BoundedSemaphore(TRABAJOS_MAX_PENDIENTES)
+TRABAJOS_PENDIENTES = Medidor(
+    "clasificador_trabajos_pendientes", "Trabajos encolados o en proceso en este worker")
+
+
+def _actualizar(trabajo: dict, **campos):
+    trabajo.update(campos, actualizado=time.time())
+    almacen.guardar(trabajo)
+
+
+def _ejecutar(trabajo: dict, lote):
+    try:
+        _actualizar(trabajo, estado=EN_PROCESO)
+        with medir_solicitud("trabajo") as medicion:
+            resultado, codigo = ejecutar_clasificacion(lote.archivos)
+            medicion["codigo"] = codigo
+        estado = COMPLETADO if codigo == 200 else FALLIDO
+        _actualizar(trabajo, estado=estado, codigo=codigo, resultado=resultado)
+    except MemoryError:
+        logger.critical(f"💥 Error de memoria en el trabajo {trabajo['id']}")
+        _actualizar(trabajo, estado=FALLIDO, codigo=413, resultado={
+            "error": "El servidor no tiene suficiente memoria para procesar este archivo."
+        })
+    except Exception as e:
+        logger.exception(f"❌ Error en el trabajo {trabajo['id']}")
+        _actualizar(trabajo, estado=FALLIDO, codigo=500, resultado={
+            "error": "Error interno del servidor",
+            "detalle": str(e)
+        })
+    finally:
+        lote.limpiar()
+        TRABAJOS_PENDIENTES.restar()
+        _pendientes.release()
+
+
+def encolar_trabajo(archivos, url_cliente: str) -> dict:
+    """
+    Registra un trabajo y lo envía al pool de workers.
+    Lanza ColaTrabajosLlena si ya hay TRABAJOS_MAX_PENDIENTES en curso.
+    """
+    if not _pendientes.acquire(blocking=False):
+        raise ColaTrabajosLlena("Demasiados trabajos pendientes")
+
+    lote = None
+    try:
+        # El stream original se cierra al terminar la petición: se vuelca a disco
+        lote = volcar_archivos(archivos)
+        ahora = time.time()
+        almacen.purgar(ahora - TRABAJOS_TTL)
+        trabajo = {
+            "id": uuid.uuid4().hex,
+            "estado": PENDIENTE,
+            "url": url_cliente,
+            "archivos": [archivo.filename for archivo in lote.archivos],
+            "creado": ahora,
+            "actualizado": ahora,
+        }
+        almacen.guardar(trabajo)
+        _executor.submit(_ejecutar, dict(trabajo), lote)
+        TRABAJOS_PENDIENTES.sumar()
+    except Exception:
+        if lote is not None:
+            lote.limpiar()
+        _pendientes.release()
+        raise
+
+    logger.info(f"🗂️ Trabajo {trabajo['id']} encolado con {len(lote.archivos)} archivos")
+    return trabajo
+
+
+def obtener_trabajo(id_trabajo: str):
+    return almacen.obtener(id_trabajo)
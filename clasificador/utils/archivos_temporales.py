@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+from werkzeug.utils import secure_filename
+
+# 🧩 Volcado de archivos subidos a disco
+# Los extractores leen desde la ruta: la memoria por petición queda acotada por el
+# trabajo en curso y no por la suma de los tamaños de las subidas.
+SPOOL_DIR = os.getenv("SPOOL_DIR") or None  # None → directorio temporal del sistema
+
+
+class ArchivoEnDisco:
+    """Archivo subido ya volcado a disco; expone filename y mimetype como FileStorage."""
+
+    def __init__(self, filename: str, mimetype: str, ruta: str):
+        self.filename = filename
+        self.mimetype = mimetype
+        self.ruta = ruta
+
+    @property
+    def tamano(self) -> int:
+        return os.path.getsize(self.ruta)
+
+
+class LoteTemporal:
+    """Directorio temporal con los archivos de una petición; se elimina completo al cerrar."""
+
+    def __init__(self):
+        self.directorio = tempfile.mkdtemp(prefix="subida_", dir=SPOOL_DIR)
+        self.archivos = []
+
+    def _ruta_nueva(self, filename: str) -> str:
+        nombre = secure_filename(filename or "") or "archivo"
+        return os.path.join(self.directorio, f"{len(self.archivos):03d}_{nombre}")
+
+    def agregar(self, archivo_subido) -> ArchivoEnDisco:
+        ruta = self._ruta_nueva(archivo_subido.filename)
+        archivo_subido.save(ruta)  # copia por bloques, sin cargar el archivo en memoria
+        archivo = ArchivoEnDisco(archivo_subido.filename, archivo_subido.mimetype, ruta)
+        self.archivos.append(archivo)
+        return archivo
+
+    def agregar_flujo(self, filename: str, mimetype: str, flujo) -> ArchivoEnDisco:
+        """Como `agregar`, para un objeto tipo archivo (p. ej. un miembro de un zip)."""
+        ruta = self._ruta_nueva(filename)
+        with open(ruta, "wb") as destino:
+            shutil.copyfileobj(flujo, destino, 1024 * 1024)
+        archivo = ArchivoEnDisco(filename, mimetype, ruta)
+        self.archivos.append(archivo)
+        return archivo
+
+    def limpiar(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.limpiar()
+
+
+def volcar_archivos(archivos_subidos) -> LoteTemporal:
+    """Vuelca a disco los archivos de la petición. Limpia lo ya escrito si algo falla."""
+    lote = LoteTemporal()
+    try:
+        for archivo in archivos_subidos:
+            lote.agregar(archivo)
+    except Exception:
+        lote.limpiar()
+        raise
+    return lote
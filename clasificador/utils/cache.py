@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from clasificador.utils.sqlite_local import ConexionesSQLite
+
+# 🧩 Caché de dos niveles: LRU en memoria + SQLite opcional compartido entre workers
+
+
+class CacheLRU:
+    """
+    Caché en memoria (LRU), segura entre hilos.
+    Se acota por número de entradas y, opcionalmente, por caracteres totales y por
+    antigüedad (`ttl` en segundos).
+    """
+
+    def __init__(self, max_entradas: int = 256, max_caracteres: int = None, ttl: float = None):
+        self.max_entradas = max_entradas
+        self.max_caracteres = max_caracteres
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (valor, expira)
+        self._caracteres = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str):
+        with self._lock:
+            if clave not in self._datos:
+                return None
+            valor, expira = self._datos[clave]
+            if expira is not None and expira <= time.time():
+                del self._datos[clave]
+                self._caracteres -= len(valor)
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: str, expira: float = None):
+        """`expira` (epoch) conserva el vencimiento de una entrada traída de otro nivel."""
+        if self.max_entradas <= 0:
+            return
+        if self.max_caracteres is not None and len(valor) > self.max_caracteres:
+            return
+        if expira is None:
+            expira = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            if clave in self._datos:
+                self._caracteres -= len(self._datos.pop(clave)[0])
+            self._datos[clave] = (valor, expira)
+            self._caracteres += len(valor)
+            while len(self._datos) > self.max_entradas or (
+                self.max_caracteres is not None and self._caracteres > self.max_caracteres
+            ):
+                _, (descartado, _) = self._datos.popitem(last=False)
+                self._caracteres -= len(descartado)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._datos)
+
+
+class CacheSQLite:
+    """
+    Caché persistente en un archivo SQLite, compartido por todos los workers de gunicorn.
+    Con `ttl`, las entradas vencidas se ignoran y se purgan periódicamente.
+    """
+
+    PURGAR_CADA = 500  # escrituras entre purgas de entradas vencidas
+
+    def __init__(self, ruta: str, tabla: str, ttl: float = None):
+        self.ruta = ruta
+        self.tabla = tabla
+        self.ttl = ttl
+        self._escrituras = 0
+        self._conexiones = ConexionesSQLite(ruta)
+        self._conexiones.ejecutar_ddl(
+            f"CREATE TABLE IF NOT EXISTS {tabla} (clave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira REAL)"
+        )
+        try:
+            # Tablas creadas antes de que existiera el vencimiento
+            self._conexiones.ejecutar_ddl(f"ALTER TABLE {tabla} ADD COLUMN expira REAL")
+        except sqlite3.OperationalError:
+            pass
+
+    def obtener(self, clave: str):
+        fila = self.obtener_con_vencimiento(clave)
+        return fila[0] if fila else None
+
+    def obtener_con_vencimiento(self, clave: str):
+        """(valor, expira) de la entrada vigente, o None. `expira` es None si no vence."""
+        return self._conexiones.obtener().execute(
+            f"SELECT valor, expira FROM {self.tabla} WHERE clave = ? AND (expira IS NULL OR expira > ?)",
+            (clave, time.time()),
+        ).fetchone()
+
+    def guardar(self, clave: str, valor: str):
+        expira = time.time() + self.ttl if self.ttl else None
+        with self._conexiones.obtener() as con:
+            con.execute(
+                f"INSERT OR REPLACE INTO {self.tabla} (clave, valor, expira) VALUES (?, ?, ?)",
+                (clave, valor, expira),
+            )
+            self._escrituras += 1
+            if self.ttl and self._escrituras % self.PURGAR_CADA == 0:
+                con.execute(f"DELETE FROM {self.tabla} WHERE expira <= ?", (time.time(),))
+
+
+class CacheDosNiveles:
+    """
+    Combina un LRU en memoria con un nivel en disco opcional.
+    Lleva contadores de aciertos y fallos por nivel.
+    """
+
+    def __init__(self, nombre: str, max_entradas: int = 256, max_caracteres: int = None,
+                 ruta_sqlite: str = None, ttl: float = None):
+        self.nombre = nombre
+        self.memoria = CacheLRU(max_entradas, max_caracteres, ttl)
+        self.disco = CacheSQLite(ruta_sqlite, nombre, ttl) if ruta_sqlite else None
+        self._lock = threading.Lock()
+        self._contadores = {"aciertos_memoria": 0, "aciertos_disco": 0, "fallos": 0, "errores_disco": 0}
+
+    def _contar(self, campo: str):
+        with self._lock:
+            self._contadores[campo] += 1
+
+    def obtener(self, clave: str):
+        valor = self.memoria.obtener(clave)
+        if valor is not None:
+            self._contar("aciertos_memoria")
+            return valor
+
+        if self.disco is not None:
+            try:
+                fila = self.disco.obtener_con_vencimiento(clave)
+            except sqlite3.Error:
+                self._contar("errores_disco")
+                fila = None
+            if fila is not None:
+                # En memoria vive solo lo que le queda en disco, no un TTL completo nuevo
+                valor, expira = fila
+                self.memoria.guardar(clave, valor, expira)
+                self._contar("aciertos_disco")
+                return valor
+
+        self._contar("fallos")
+        return None
+
+    def guardar(self, clave: str, valor: str):
+        self.memoria.guardar(clave, valor)
+        if self.disco is not None:
+            try:
+                self.disco.guardar(clave, valor)
+            except sqlite3.Error:
+                self._contar("errores_disco")
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            datos = dict(self._contadores)
+        aciertos = datos["aciertos_memoria"] + datos["aciertos_disco"]
+        total = aciertos + datos["fallos"]
+        datos["aciertos"] = aciertos
+        datos["tasa_aciertos"] = round(aciertos / total, 4) if total else 0.0
+        datos["entradas_memoria"] = len(self.memoria)
+        datos["disco"] = self.disco.ruta if self.disco else None
+        return datos
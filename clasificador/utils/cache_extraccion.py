@@ -0,0 +1,84 @@
+import hashlib
+import os
+from pathlib import Path
+from clasificador.utils.cache import CacheDosNiveles
+from clasificador.utils.conversor_texto import HUELLA_CONFIGURACION_OCR, OCR_MIN_CARACTERES_PAGINA, OrigenArchivo
+from clasificador.utils.normalizador_texto import NORMALIZACION_VERSION
+
+# 🧩 Caché de texto extraído, direccionada por contenido
+# EXTRACCION_CACHE_DB: ruta de un SQLite compartido por los workers (opcional)
+EXTRACCION_CACHE_MAX_ENTRADAS = int(os.getenv("EXTRACCION_CACHE_MAX_ENTRADAS", "128"))
+EXTRACCION_CACHE_MAX_CARACTERES = int(os.getenv("EXTRACCION_CACHE_MAX_CARACTERES", str(50_000_000)))
+EXTRACCION_CACHE_DB = os.getenv("EXTRACCION_CACHE_DB") or None
+# Texto de OCR por página: al subir el presupuesto de OCR solo se leen las páginas nuevas
+OCR_CACHE_MAX_PAGINAS = int(os.getenv("OCR_CACHE_MAX_PAGINAS", "5000"))
+
+cache_extraccion = CacheDosNiveles(
+    "extraccion",
+    max_entradas=EXTRACCION_CACHE_MAX_ENTRADAS,
+    max_caracteres=EXTRACCION_CACHE_MAX_CARACTERES,
+    ruta_sqlite=EXTRACCION_CACHE_DB,
+)
+cache_paginas_ocr = CacheDosNiveles(
+    "ocr_paginas",
+    max_entradas=OCR_CACHE_MAX_PAGINAS,
+    ruta_sqlite=EXTRACCION_CACHE_DB,
+)
+
+
+def _version(*partes) -> str:
+    return hashlib.sha256("|".join(str(parte) for parte in partes).encode()).hexdigest()[:12]
+
+
+# Páginas: solo la configuración de OCR. Documentos: además, qué páginas van a OCR y la normalización
+VERSION_PAGINA_OCR = _version(HUELLA_CONFIGURACION_OCR)
+VERSION_EXTRACCION = _version(HUELLA_CONFIGURACION_OCR, OCR_MIN_CARACTERES_PAGINA, NORMALIZACION_VERSION)
+
+
+def huella_archivo(origen: OrigenArchivo) -> str:
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(origen).hexdigest()
+    digest = hashlib.sha256()
+    with open(origen, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def clave_extraccion(nombre_archivo: str, origen: OrigenArchivo, huella: str = None) -> str:
+    """
+    Clave = SHA-256 del contenido + extensión + versión del extractor, ajustes de OCR
+    y normalización. Cambiar cualquiera de ellas invalida las entradas anteriores.
+    `huella`: SHA-256 del contenido si ya se calculó (huella_archivo).
+    """
+    extension = Path(nombre_archivo).suffix.lower()
+    digest = huella or huella_archivo(origen)
+    return f"{digest}:{extension}:{VERSION_EXTRACCION}"
+
+
+def obtener_texto(clave: str):
+    return cache_extraccion.obtener(clave)
+
+
+def guardar_texto(clave: str, texto: str):
+    cache_extraccion.guardar(clave, texto)
+
+
+def estadisticas_cache() -> dict:
+    return cache_extraccion.estadisticas()
+
+
+def estadisticas_cache_paginas() -> dict:
+    return cache_paginas_ocr.estadisticas()
+
+
+def _clave_pagina(huella: str, pagina: int) -> str:
+    return f"{huella}:{pagina}:{VERSION_PAGINA_OCR}"
+
+
+def obtener_pagina_ocr(huella: str, pagina: int):
+    return cache_paginas_ocr.obtener(_clave_pagina(huella, pagina))
+
+
+def guardar_pagina_ocr(huella: str, pagina: int, texto: str):
+    cache_paginas_ocr.guardar(_clave_pagina(huella, pagina), texto)
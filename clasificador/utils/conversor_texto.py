@@ -1,101 +1,684 @@
+import importlib
 import io
-import pytesseract
-import pandas as pd
-from PIL import Image
-from docx import Document
-from pdf2image import convert_from_bytes
-from PyPDF2 import PdfReader
+import os
+import logging
+import multiprocessing
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturoVencido
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from typing import Union
+from clasificador.utils.metricas import (
+    cronometro, registrar_etapa, Medidor, PAGINAS_OCR, FALLBACK_OCR, OCR_REPETIDAS, PAGINAS_SIN_OCR
+)
+from clasificador.utils.planificador import PlanificadorJusto
+from clasificador.utils.preprocesado_ocr import OCR_ALTURA_LINEA, OCR_BINARIZAR
+
+logger = logging.getLogger(__name__)
 
 # 🧩 Configuración global OCR
-# Evita recargar idioma y modelos en cada llamada
-pytesseract.pytesseract.tesseract_cmd = "/usr/bin/tesseract"
+TESSERACT_CMD = "/usr/bin/tesseract"
+OCR_IDIOMA = "spa"
 OCR_CONFIG = "--oem 3 --psm 6"  # Equilibrio entre precisión y velocidad
 
-# 🔹 PDF no escaneado (texto seleccionable)
+# Versión de los extractores: incrementarla invalida la caché de extracción
+EXTRACTOR_VERSION = "6"
+
+# Los extractores conservan los saltos de línea y separan las páginas con "\f": la
+# normalización (normalizador_texto) los usa para detectar encabezados y pies repetidos
+SEPARADOR_PAGINA = "\f"
+
+# Prefijos con los que los extractores devuelven sus errores como texto
+PREFIJOS_ERROR = ("Error en OCR:", "Error leyendo imagen:", "Error leyendo Word:",
+                  "Error leyendo Excel:", "Formato no soportado")
+
+
+# Los extractores reciben el contenido en memoria o, preferiblemente, la ruta del
+# archivo en disco: así no se duplica en memoria el tamaño de cada subida
+OrigenArchivo = Union[bytes, str, os.PathLike]
+
+
+def _es_ruta(origen: OrigenArchivo) -> bool:
+    return isinstance(origen, (str, os.PathLike))
+
+
+def _abrir(origen: OrigenArchivo):
+    """Objeto tipo archivo sobre el origen (el archivo en disco se lee bajo demanda)."""
+    if _es_ruta(origen):
+        return open(origen, "rb")
+    return io.BytesIO(origen)
+
+
+class _RutaPDF:
+    """
+    Ruta en disco del PDF para poppler. Si el origen son bytes se escriben una sola
+    vez a un archivo temporal, en lugar de una vez por cada ventana renderizada.
+    """
+
+    def __init__(self, origen: OrigenArchivo):
+        self._temporal = None
+        if _es_ruta(origen):
+            self.ruta = os.fspath(origen)
+        else:
+            self._temporal = tempfile.NamedTemporaryFile(prefix="pdf_", suffix=".pdf", delete=False)
+            with self._temporal as f:
+                f.write(origen)
+            self.ruta = self._temporal.name
+
+    def __enter__(self):
+        return self.ruta
+
+    def __exit__(self, *exc):
+        if self._temporal is not None:
+            os.unlink(self._temporal.name)
+
 
-def extraer_texto_pdf(file_bytes: bytes) -> str:
-    # Intentar extracción por texto (PDF no escaneado)
+# 🧩 Backends de extracción cargados en el primer uso de cada tipo de archivo
+# (openpyxl, PIL, pdf2image... suman segundos al arranque en frío si se importan siempre)
+MODULOS_EXTRACTORES = ("PyPDF2", "pdf2image", "PIL.Image", "pytesseract", "docx", "openpyxl", "xlrd")
+
+
+def _tesseract():
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return pytesseract
+
+
+def precargar_extractores() -> dict:
+    """
+    Importa todos los backends y comprueba que Tesseract tenga el idioma de OCR.
+    Pensado para el proceso maestro de gunicorn (gunicorn.conf.py): los workers
+    heredan los módulos ya cargados al hacer fork. No lanza excepciones.
+    """
+    estado = {"modulos": {}, "tesseract_idioma": None}
+    for modulo in MODULOS_EXTRACTORES:
+        inicio = time.perf_counter()
+        try:
+            importlib.import_module(modulo)
+            estado["modulos"][modulo] = round(time.perf_counter() - inicio, 3)
+        except ImportError as e:
+            estado["modulos"][modulo] = None
+            logger.warning(f"⚠️ No se pudo importar {modulo}: {e}")
     try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        texto = "".join([page.extract_text() or "" for page in reader.pages])
-        # Limpieza básica
-        texto = texto.replace("\n", " ").replace("\r", " ").strip()
+        estado["tesseract_idioma"] = OCR_IDIOMA in _tesseract().get_languages(config="")
+        if not estado["tesseract_idioma"]:
+            logger.warning(f"⚠️ Tesseract no tiene el idioma '{OCR_IDIOMA}' (falta {OCR_IDIOMA}.traineddata)")
+    except Exception as e:
+        logger.warning(f"⚠️ Tesseract no disponible: {e}")
+    return estado
+
+
+def es_error_extraccion(texto: str) -> bool:
+    """Indica si el texto devuelto por un extractor es en realidad un mensaje de error."""
+    return texto.startswith(PREFIJOS_ERROR)
+
+
+def nucleos_disponibles() -> int:
+    """Núcleos realmente asignados al contenedor (afinidad y cuota de cgroup)."""
+    try:
+        nucleos = len(os.sched_getaffinity(0))
+    except AttributeError:
+        nucleos = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            cuota, periodo = f.read().split()
+        if cuota != "max":
+            nucleos = min(nucleos, max(1, int(int(cuota) / int(periodo))))
+    except (OSError, ValueError):
+        pass
+    return max(1, nucleos)
+
+
+# 🧩 OCR (páginas de PDF e imágenes) en un único pool de procesos por worker,
+# repartido por turnos entre peticiones. OCR_PROCESOS=1 ejecuta el OCR en el mismo proceso (sin pool)
+OCR_DPI = int(os.getenv("OCR_DPI", "150"))
+# OCR adaptativo: las páginas con confianza media de Tesseract por debajo de OCR_CONFIANZA_MIN
+# se repiten a OCR_DPI_ALTO (las imágenes, ampliando la letra pequeña) y se queda la mejor lectura
+OCR_ADAPTATIVO = os.getenv("OCR_ADAPTATIVO", "1") == "1"
+OCR_DPI_ALTO = int(os.getenv("OCR_DPI_ALTO", "300"))
+OCR_CONFIANZA_MIN = float(os.getenv("OCR_CONFIANZA_MIN", "60"))
+OCR_PROCESOS = int(os.getenv("OCR_PROCESOS", "0")) or nucleos_disponibles()
+OCR_VENTANA_PAGINAS = int(os.getenv("OCR_VENTANA_PAGINAS", "0")) or max(4, OCR_PROCESOS * 2)
+# Páginas con menos caracteres nativos que este umbral se envían a OCR
+OCR_MIN_CARACTERES_PAGINA = int(os.getenv("OCR_MIN_CARACTERES_PAGINA", "25"))
+
+# Huella de todo lo que cambia el texto de una página de OCR: forma parte de las claves
+# de la caché de extracción (cache_extraccion), así cambiar un ajuste no sirve textos viejos
+HUELLA_CONFIGURACION_OCR = "|".join(str(valor) for valor in (
+    EXTRACTOR_VERSION, OCR_IDIOMA, OCR_CONFIG, OCR_DPI, OCR_DPI_ALTO, OCR_ADAPTATIVO,
+    OCR_CONFIANZA_MIN, OCR_ALTURA_LINEA, OCR_BINARIZAR,
+))
+# Los procesos del pool no se crean con fork: el worker tiene hilos (gthread, extracción,
+# dispersión) y un fork puede heredar un lock tomado por otro hilo y bloquearse para siempre
+OCR_INICIO_PROCESOS = os.getenv("OCR_INICIO_PROCESOS", "forkserver")
+# Segundos máximos de espera por el OCR de una página o imagen
+OCR_TIMEOUT_PAGINA = float(os.getenv("OCR_TIMEOUT_PAGINA", "300"))
+
+
+def _crear_pool_ocr() -> ProcessPoolExecutor:
+    contexto = multiprocessing.get_context(OCR_INICIO_PROCESOS)
+    if OCR_INICIO_PROCESOS == "forkserver":
+        # El servidor importa una sola vez lo que usan los procesos de OCR
+        contexto.set_forkserver_preload([__name__, "PIL.Image", "pytesseract", "pdf2image"])
+    return ProcessPoolExecutor(max_workers=OCR_PROCESOS, mp_context=contexto)
+
+
+planificador_ocr = PlanificadorJusto(_crear_pool_ocr, OCR_PROCESOS)
+
+OCR_EN_CURSO = Medidor(
+    "clasificador_ocr_tareas_en_curso", "Páginas o imágenes enviadas al pool de OCR",
+    funcion=lambda: planificador_ocr.estadisticas()["en_curso"])
+OCR_EN_ESPERA = Medidor(
+    "clasificador_ocr_tareas_en_espera", "Páginas o imágenes esperando turno en el pool de OCR",
+    funcion=lambda: planificador_ocr.estadisticas()["en_espera"])
+
+# 🧩 Presupuesto de páginas de OCR (0 = sin límite), por documento y por petición.
+# Desactivado por defecto: con presupuesto, un PDF escaneado largo pierde texto de las
+# páginas que quedan fuera (se señalan con MARCA_SIN_OCR). Valores de referencia: 40 y 120.
+# Las páginas se eligen por prioridad: las primeras (despacho, partes, radicado), las
+# últimas (pretensiones, cierre) y luego el medio muestreado por bisección. El orden es
+# fijo, así que al subir el presupuesto solo se procesan las páginas nuevas: las ya
+# leídas salen de la caché de páginas (cache_extraccion).
+OCR_PRESUPUESTO_DOCUMENTO = int(os.getenv("OCR_PRESUPUESTO_DOCUMENTO", "0"))
+OCR_PRESUPUESTO_SOLICITUD = int(os.getenv("OCR_PRESUPUESTO_SOLICITUD", "0"))
+OCR_PAGINAS_INICIO = int(os.getenv("OCR_PAGINAS_INICIO", "10"))
+OCR_PAGINAS_FIN = int(os.getenv("OCR_PAGINAS_FIN", "5"))
+
+# Se añade al final del texto cuando quedan páginas sin OCR (Gemini también lo ve)
+MARCA_SIN_OCR = "[Páginas sin OCR por presupuesto: {rangos} de {total}]"
+_MARCA_SIN_OCR = re.compile(r"\[Páginas sin OCR por presupuesto: ([\d, -]+) de (\d+)\]\s*$")
+
+
+class PresupuestoOCR:
+    """Páginas de OCR que le quedan a una petición, compartidas entre sus documentos."""
+
+    def __init__(self, paginas: int):
+        self.restantes = paginas
+        self._lock = threading.Lock()
+
+    def reservar(self, paginas: int) -> int:
+        with self._lock:
+            concedidas = min(paginas, self.restantes)
+            self.restantes -= concedidas
+            return concedidas
+
+
+_presupuesto_solicitud = ContextVar("presupuesto_ocr", default=None)
+
+
+@contextmanager
+def presupuesto_ocr_solicitud(paginas: int = OCR_PRESUPUESTO_SOLICITUD):
+    """
+    Presupuesto común a las extracciones enviadas dentro del bloque (los hilos de
+    extracción heredan el contexto con propagar_contexto).
+    """
+    token = _presupuesto_solicitud.set(PresupuestoOCR(paginas) if paginas > 0 else None)
+    try:
+        yield
+    finally:
+        _presupuesto_solicitud.reset(token)
+
+
+def orden_prioridad(total_paginas: int) -> list:
+    """Páginas 1..total en orden de prioridad: inicio, final y bisección del medio."""
+    inicio = list(range(1, min(OCR_PAGINAS_INICIO, total_paginas) + 1))
+    fin = [n for n in range(total_paginas, max(len(inicio), total_paginas - OCR_PAGINAS_FIN), -1)]
+    orden = inicio + fin
+    intervalos = deque([(len(inicio) + 1, total_paginas - len(fin))])
+    while intervalos:
+        desde, hasta = intervalos.popleft()
+        if desde > hasta:
+            continue
+        medio = (desde + hasta) // 2
+        orden.append(medio)
+        intervalos.extend([(desde, medio - 1), (medio + 1, hasta)])
+    return orden
+
+
+def _rangos(paginas: list) -> str:
+    """[3, 4, 5, 9] → "3-5, 9"."""
+    grupos = []
+    for n in sorted(paginas):
+        if grupos and n == grupos[-1][1] + 1:
+            grupos[-1][1] = n
+        else:
+            grupos.append([n, n])
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in grupos)
+
+
+def paginas_sin_ocr(texto: str):
+    """Rangos de páginas que quedaron sin OCR por presupuesto ("12-80, 95"), o None."""
+    inicio = texto.rfind(MARCA_SIN_OCR.split("{")[0])
+    coincidencia = _MARCA_SIN_OCR.match(texto, inicio) if inicio >= 0 else None
+    return coincidencia.group(1) if coincidencia else None
+
+
+def es_extraccion_parcial(texto: str) -> bool:
+    return paginas_sin_ocr(texto) is not None
+
+
+def _ocr_con_presupuesto(ruta_pdf: str, paginas: list, total_paginas: int, huella: str = None) -> tuple:
+    """
+    OCR de las páginas candidatas que caben en el presupuesto, por prioridad. Las que
+    ya están en la caché de páginas no gastan presupuesto. `huella` es el SHA-256 del
+    PDF si ya se calculó (clave de la caché de extracción): así no se lee dos veces.
+    Devuelve ({pagina: texto}, paginas_omitidas).
+    """
+    from clasificador.utils.cache_extraccion import huella_archivo, obtener_pagina_ocr, guardar_pagina_ocr
+
+    candidatas = set(paginas)
+    orden = [n for n in orden_prioridad(total_paginas) if n in candidatas]
+
+    huella = huella or huella_archivo(ruta_pdf)
+    textos = {}
+    for n in orden:
+        texto = obtener_pagina_ocr(huella, n)
+        if texto is not None:
+            textos[n] = texto
+
+    faltantes = [n for n in orden if n not in textos]
+    limite = min(len(faltantes), OCR_PRESUPUESTO_DOCUMENTO) if OCR_PRESUPUESTO_DOCUMENTO > 0 else len(faltantes)
+    presupuesto = _presupuesto_solicitud.get()
+    if presupuesto is not None:
+        limite = presupuesto.reservar(limite)
+    elegidas, omitidas = faltantes[:limite], sorted(faltantes[limite:])
+
+    nuevas = _ocr_paginas_ruta(ruta_pdf, elegidas)
+    for n, texto in nuevas.items():
+        guardar_pagina_ocr(huella, n, texto)
+    textos.update(nuevas)
+
+    if omitidas:
+        PAGINAS_SIN_OCR.incrementar(len(omitidas))
+        logger.info(
+            f"📑 OCR de {len(elegidas)} de {len(orden)} páginas ({len(textos) - len(nuevas)} desde caché); "
+            f"sin OCR por presupuesto: {_rangos(omitidas)}"
+        )
+    return textos, omitidas
+
+
+def _con_marca_sin_ocr(texto: str, omitidas: list, total_paginas: int) -> str:
+    if not omitidas:
         return texto
+    marca = MARCA_SIN_OCR.format(rangos=_rangos(omitidas), total=total_paginas)
+    return f"{texto}{SEPARADOR_PAGINA}{marca}"
+
+
+def _ocr_con_confianza(imagen, ampliar: bool = False) -> tuple:
+    """Preprocesa y reconoce la imagen. Devuelve (texto, confianza media de las palabras 0-100)."""
+    from clasificador.utils.preprocesado_ocr import preprocesar_imagen
+
+    tesseract = _tesseract()
+    datos = tesseract.image_to_data(
+        preprocesar_imagen(imagen, ampliar), lang=OCR_IDIOMA, config=OCR_CONFIG,
+        output_type=tesseract.Output.DICT,
+    )
+    renglones, confianzas = {}, []
+    for i, palabra in enumerate(datos["text"]):
+        if not palabra.strip():
+            continue
+        renglon = (datos["block_num"][i], datos["par_num"][i], datos["line_num"][i])
+        renglones.setdefault(renglon, []).append(palabra.strip())
+        if float(datos["conf"][i]) >= 0:
+            confianzas.append(float(datos["conf"][i]))
+    texto = "\n".join(" ".join(palabras) for palabras in renglones.values())
+    return texto, (sum(confianzas) / len(confianzas) if confianzas else 0.0)
+
+
+def _ocr_pagina(ruta_imagen: str, ruta_pdf: str = None, pagina: int = None) -> tuple:
+    """
+    OCR de una página ya renderizada a disco (se ejecuta en el pool). Si la confianza
+    es baja, la vuelve a renderizar a OCR_DPI_ALTO.
+    Devuelve (texto, segundos_ocr, repetida, segundos_render).
+    """
+    from PIL import Image
+
+    inicio = time.perf_counter()
+    render = 0.0
+    with Image.open(ruta_imagen) as page:
+        texto, confianza = _ocr_con_confianza(page)
+    repetida = OCR_ADAPTATIVO and ruta_pdf is not None and confianza < OCR_CONFIANZA_MIN
+    if repetida:
+        with tempfile.TemporaryDirectory(prefix="ocr_alto_") as directorio:
+            inicio_render = time.perf_counter()
+            ruta_alta = _renderizar(ruta_pdf, [pagina], directorio, OCR_DPI_ALTO)[0]
+            render = time.perf_counter() - inicio_render
+            with Image.open(ruta_alta) as page:
+                texto_alto, confianza_alta = _ocr_con_confianza(page)
+        if confianza_alta > confianza:
+            texto = texto_alto
+    return texto, time.perf_counter() - inicio - render, repetida, render
+
+
+def _registrar_pagina(resultado: tuple, origen: str = "pdf") -> str:
+    # Los tiempos se miden en el proceso del pool y se registran en el de la petición:
+    # las métricas de un proceso hijo no llegan a /metrics
+    texto, segundos, repetida, render = resultado
+    registrar_etapa("ocr_pagina" if origen == "pdf" else f"ocr_{origen}", segundos, origen)
+    if render:
+        registrar_etapa("pdf_render", render, origen)
+    PAGINAS_OCR.incrementar(origen=origen)
+    if repetida:
+        OCR_REPETIDAS.incrementar(origen=origen)
+    return texto
+
+
+def _ventanas(paginas: list, tamano: int):
+    """Agrupa números de página en rangos contiguos de como máximo `tamano` páginas."""
+    ventana = []
+    for n in paginas:
+        if ventana and (n != ventana[-1] + 1 or len(ventana) >= tamano):
+            yield ventana
+            ventana = []
+        ventana.append(n)
+    if ventana:
+        yield ventana
+
+
+def _renderizar(ruta_pdf: str, ventana: list, directorio: str, dpi: int = OCR_DPI) -> list:
+    # Sin métricas: también se llama dentro del pool (ver _ocr_pagina)
+    from pdf2image import convert_from_path
+
+    return convert_from_path(
+        ruta_pdf,
+        dpi=dpi,
+        first_page=ventana[0],
+        last_page=ventana[-1],
+        output_folder=directorio,
+        paths_only=True,
+        grayscale=True,
+    )
+
+
+def _renderizar_ventana(ruta_pdf: str, ventana: list, directorio: str) -> list:
+    with cronometro("pdf_render", "pdf"):
+        return _renderizar(ruta_pdf, ventana, directorio)
+
+
+def ocr_paginas_pdf(origen: OrigenArchivo, paginas: list) -> dict:
+    """
+    OCR de las páginas indicadas (numeradas desde 1). Devuelve {pagina: texto}.
+    Renderiza por ventanas a un directorio temporal, de modo que en memoria y en disco
+    solo hay dos ventanas a la vez; mientras el pool procesa una, se renderiza la siguiente.
+    """
+    paginas = sorted(set(paginas))
+    if not paginas:
+        return {}
+    with _RutaPDF(origen) as ruta_pdf:
+        return _ocr_paginas_ruta(ruta_pdf, paginas)
+
+
+def _ocr_paginas_ruta(ruta_pdf: str, paginas: list) -> dict:
+    resultados = {}
+    if OCR_PROCESOS <= 1:
+        for ventana in _ventanas(paginas, OCR_VENTANA_PAGINAS):
+            with tempfile.TemporaryDirectory(prefix="ocr_") as directorio:
+                rutas = _renderizar_ventana(ruta_pdf, ventana, directorio)
+                for n, ruta in zip(ventana, rutas):
+                    resultados[n] = _registrar_pagina(_ocr_pagina(ruta, ruta_pdf, n))
+        return resultados
+
+    pendiente = None  # (directorio, ventana, futures) de la ventana en proceso
+    try:
+        for ventana in _ventanas(paginas, OCR_VENTANA_PAGINAS):
+            directorio = tempfile.TemporaryDirectory(prefix="ocr_")
+            rutas = _renderizar_ventana(ruta_pdf, ventana, directorio.name)
+            futures = [planificador_ocr.enviar(_ocr_pagina, ruta, ruta_pdf, n) for n, ruta in zip(ventana, rutas)]
+            anterior, pendiente = pendiente, (directorio, ventana, futures)
+            if anterior:
+                _recoger_ventana(anterior, resultados)
+        if pendiente:
+            _recoger_ventana(pendiente, resultados)
+            pendiente = None
+    finally:
+        if pendiente:
+            for future in pendiente[2]:
+                future.cancel()
+            pendiente[0].cleanup()
+    return resultados
+
+
+def _esperar_ocr(future):
+    """Resultado de una tarea del pool de OCR; si no llega en OCR_TIMEOUT_PAGINA se cancela."""
+    try:
+        return future.result(timeout=OCR_TIMEOUT_PAGINA)
+    except FuturoVencido:
+        future.cancel()
+        raise TimeoutError(f"OCR sin respuesta tras {OCR_TIMEOUT_PAGINA:g}s")
+
+
+def _recoger_ventana(pendiente, resultados: dict):
+    directorio, ventana, futures = pendiente
+    try:
+        for n, future in zip(ventana, futures):
+            resultados[n] = _registrar_pagina(_esperar_ocr(future))
+    except Exception:
+        # Las páginas de la ventana que aún esperan turno no llegan al pool
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        directorio.cleanup()
+
+# 🔹 PDF no escaneado (texto seleccionable)
+
+def extraer_texto_pdf(origen: OrigenArchivo, ocr_hibrido: bool = True, huella: str = None) -> str:
+    """
+    Extrae el texto nativo página por página. Con `ocr_hibrido`, solo las páginas
+    con poco texto (anexos escaneados) se envían a OCR; si PyPDF2 no puede leer
+    el documento, se hace OCR completo.
+    """
+    from PyPDF2 import PdfReader
+
+    try:
+        with cronometro("pdf_texto", "pdf"), _abrir(origen) as f:
+            reader = PdfReader(f)
+            textos = [(page.extract_text() or "").replace("\r", "\n").strip() for page in reader.pages]
     except Exception as e:
-        return ""
+        if not ocr_hibrido:
+            return ""
+        FALLBACK_OCR.incrementar(modo="completo")
+        return extraer_texto_pdf_ocr(origen, huella)
+
+    omitidas = []
+    if ocr_hibrido:
+        paginas_ocr = [n for n, texto in enumerate(textos, start=1) if len(texto) < OCR_MIN_CARACTERES_PAGINA]
+        if paginas_ocr:
+            FALLBACK_OCR.incrementar(modo="completo" if len(paginas_ocr) == len(textos) else "parcial")
+            try:
+                with _RutaPDF(origen) as ruta_pdf:
+                    ocr, omitidas = _ocr_con_presupuesto(ruta_pdf, paginas_ocr, len(textos), huella)
+                for n, texto in ocr.items():
+                    texto = texto.strip()
+                    if len(texto) > len(textos[n - 1]):
+                        textos[n - 1] = texto
+            except Exception as e:
+                logger.warning(f"⚠️ OCR de páginas sin texto falló, se conserva el texto nativo: {e}")
+
+    texto = SEPARADOR_PAGINA.join(texto for texto in textos if texto).strip()
+    return _con_marca_sin_ocr(texto, omitidas, len(textos))
 
 # 🔹 PDF escaneado (OCR)
 
-def extraer_texto_pdf_ocr(file_bytes:bytes) -> str:
-    # OCR de PDF escaneado
+def extraer_texto_pdf_ocr(origen: OrigenArchivo, huella: str = None) -> str:
+    # OCR de PDF escaneado, por ventanas de páginas y en paralelo
+    from pdf2image import pdfinfo_from_path
+
     try:
-        pages = convert_from_bytes(file_bytes, dpi=150) # bajar resolucion mejora velocidad
-        texto_total = []
-        for page in pages:
-            # Reducción de tamaño (mitad) para acelerar OCR sin perder legibilidad
-            page = page.resize((page.width // 2, page.height // 2))
-            texto_total.append(pytesseract.image_to_string(page, lang="spa", config=OCR_CONFIG)) 
-        return " ".join(texto_total).replace("\n", " ").strip()
+        with _RutaPDF(origen) as ruta_pdf:
+            total_paginas = pdfinfo_from_path(ruta_pdf)["Pages"]
+            textos, omitidas = _ocr_con_presupuesto(
+                ruta_pdf, list(range(1, total_paginas + 1)), total_paginas, huella)
+        texto_total = [textos[n] for n in sorted(textos)]  # conserva el orden de las páginas
+        texto = SEPARADOR_PAGINA.join(texto.strip() for texto in texto_total).strip()
+        return _con_marca_sin_ocr(texto, omitidas, total_paginas)
     except Exception as e:
         return f"Error en OCR: {e}"
 
 # 🔹 Imagen (JPG, PNG)
 
-def extraer_texto_imagen(file_bytes: bytes) -> str:
+def _ocr_imagen(origen: OrigenArchivo) -> tuple:
+    """
+    OCR de una imagen (se ejecuta en el pool). Si la confianza es baja se repite
+    ampliando la letra pequeña. Devuelve (texto, segundos, repetida, 0.0), como _ocr_pagina.
+    """
+    from PIL import Image
+
+    inicio = time.perf_counter()
+    with Image.open(origen if _es_ruta(origen) else io.BytesIO(origen)) as image:
+        texto, confianza = _ocr_con_confianza(image)
+        repetida = OCR_ADAPTATIVO and confianza < OCR_CONFIANZA_MIN
+        if repetida:
+            texto_ampliado, confianza_ampliada = _ocr_con_confianza(image, ampliar=True)
+            if confianza_ampliada > confianza:
+                texto = texto_ampliado
+    return texto, time.perf_counter() - inicio, repetida, 0.0
+
+
+def extraer_texto_imagen(origen: OrigenArchivo) -> str:
     """Extrae texto de una imagen usando OCR."""
     try:
-        image = Image.open(io.BytesIO(file_bytes))
-        #Reducir resolucion si es muy grande la imagen
-        if image.width > 2000:
-            image = image.resize((image.width // 2, image.height // 2))
-        texto = pytesseract.image_to_string(image, lang="spa", config=OCR_CONFIG)
-        return texto.replace("\n", " ").strip()
+        if OCR_PROCESOS <= 1:
+            resultado = _ocr_imagen(origen)
+        else:
+            resultado = _esperar_ocr(planificador_ocr.enviar(_ocr_imagen, origen))
+        return _registrar_pagina(resultado, "imagen").strip()
     except Exception as e:
         return f"Error leyendo imagen: {e}"
     
 # 🔹 Word (.docx)    
 
-def extraer_texto_word(file_bytes: bytes) -> str:
-    """Extrae texto de un archivo Word (.docx) dado como bytes."""
+def extraer_texto_word(origen: OrigenArchivo) -> str:
+    """Extrae texto de un archivo Word (.docx) dado como bytes o ruta."""
+    from docx import Document
+
     try:    
-        doc = Document(io.BytesIO(file_bytes))
-        texto = " ".join(p.text.strip() for p in doc.paragraphs if p.text.strip())
+        with cronometro("word", "docx"), _abrir(origen) as f:
+            doc = Document(f)
+        texto = "\n".join(p.text.strip() for p in doc.paragraphs if p.text.strip())
         return texto
     except Exception as e:
         return f"Error leyendo Word: {e}"
     
 # 🔹 Excel (.xls, .xlsx)
+# Lectura fila a fila (openpyxl en modo read_only, xlrd para .xls) escribiendo cada fila
+# como celdas separadas por "; ": sin DataFrames ni el relleno de columnas de to_string.
+# Los topes por hoja acotan memoria y tiempo sea cual sea el tamaño del libro.
+EXCEL_MAX_FILAS_HOJA = int(os.getenv("EXCEL_MAX_FILAS_HOJA", "5000"))
+EXCEL_MAX_CELDAS_HOJA = int(os.getenv("EXCEL_MAX_CELDAS_HOJA", "100000"))
+# Filas vacías seguidas tras las que se da la hoja por terminada (hojas con formato hasta la fila 1.048.576)
+EXCEL_MAX_FILAS_VACIAS = 1000
+SEPARADOR_CELDAS = "; "
+
+_FIRMA_XLS = b"\xd0\xcf\x11\xe0"  # contenedor OLE de Excel 97-2003
+
 
-def extraer_texto_excel(file_bytes):
-    """Extrae texto de un archivo Excel (.xls, .xlsx) dado como bytes."""
+def _celda_texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    if hasattr(valor, "isoformat"):
+        # Fechas sin hora como AAAA-MM-DD
+        texto = valor.isoformat()
+        return texto[:10] if texto.endswith("T00:00:00") else texto
+    return " ".join(str(valor).split())
+
+
+def _escribir_hoja(salida: io.StringIO, nombre: str, filas) -> bool:
+    """Vuelca las filas de una hoja. Devuelve True si se cortó por los topes."""
+    salida.write(f"--- Hoja: {nombre} ---\n")
+    escritas = celdas = vacias = 0
+    for fila in filas:
+        valores = [_celda_texto(v) for v in fila]
+        while valores and not valores[-1]:
+            valores.pop()
+        if not valores:
+            vacias += 1
+            if vacias >= EXCEL_MAX_FILAS_VACIAS:
+                break
+            continue
+        vacias = 0
+        if escritas >= EXCEL_MAX_FILAS_HOJA or celdas >= EXCEL_MAX_CELDAS_HOJA:
+            salida.write(f"[hoja truncada: {escritas} filas, {celdas} celdas]\n")
+            return True
+        salida.write(SEPARADOR_CELDAS.join(valores))
+        salida.write("\n")
+        escritas += 1
+        celdas += sum(1 for v in valores if v)
+    return False
+
+
+def _hojas_xlsx(f):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(f, read_only=True, data_only=True)
     try:
-        xls = pd.read_excel(io.BytesIO(file_bytes), sheet_name=None)
-        contenido = []
-        for nombre, hoja in xls.items():
-            contenido.append(f"--- Hoja: {nombre} ---")
-            contenido.append(hoja.to_string(index=False))
-        return " ".join(contenido).replace("\n", " ").strip()
+        for hoja in libro.worksheets:
+            yield hoja.title, hoja.iter_rows(values_only=True)
+    finally:
+        libro.close()
+
+
+def _hojas_xls(f):
+    import xlrd
+
+    libro = xlrd.open_workbook(file_contents=f.read(), on_demand=True)
+    try:
+        for indice in range(libro.nsheets):
+            hoja = libro.sheet_by_index(indice)
+            yield hoja.name, (_fila_xls(libro, hoja.row(n)) for n in range(hoja.nrows))
+            libro.unload_sheet(indice)
+    finally:
+        libro.release_resources()
+
+
+def _fila_xls(libro, celdas) -> list:
+    import xlrd
+
+    return [
+        xlrd.xldate_as_datetime(c.value, libro.datemode) if c.ctype == xlrd.XL_CELL_DATE else c.value
+        for c in celdas
+    ]
+
+
+def extraer_texto_excel(origen: OrigenArchivo):
+    """Extrae texto de un archivo Excel (.xls, .xlsx) dado como bytes o ruta."""
+    try:
+        with cronometro("excel", "excel"), _abrir(origen) as f:
+            es_xls = f.read(4) == _FIRMA_XLS
+            f.seek(0)
+            salida = io.StringIO()
+            # closing: el libro se cierra aunque una hoja falle a mitad de camino
+            with closing(_hojas_xls(f) if es_xls else _hojas_xlsx(f)) as hojas:
+                for nombre, filas in hojas:
+                    if _escribir_hoja(salida, nombre, filas):
+                        logger.warning(f"⚠️ Hoja '{nombre}' truncada en {EXCEL_MAX_FILAS_HOJA} filas / {EXCEL_MAX_CELDAS_HOJA} celdas")
+        return salida.getvalue().strip()
     except Exception as e:
         return f"Error leyendo Excel: {e}"
 
-def extraer_texto_auto(nombre_archivo: str, file_bytes: bytes) -> str:
+def extraer_texto_auto(nombre_archivo: str, origen: OrigenArchivo, huella: str = None) -> str:
     """
     Detecta el tipo de archivo y aplica el extractor adecuado.
+    `huella`: SHA-256 del contenido ya calculado, para la caché de páginas de OCR.
     """
     nombre_archivo = nombre_archivo.lower()
     if nombre_archivo.endswith(".pdf"):
-        texto = extraer_texto_pdf(file_bytes)
-        if len(texto.strip()) < 50: #fallback a OCR si poco texto
-            texto = extraer_texto_pdf_ocr(file_bytes)
-        return texto
+        # Texto nativo por página y OCR solo de las páginas escaneadas
+        return extraer_texto_pdf(origen, huella=huella)
     
     elif nombre_archivo.endswith((".jpg", ".jpeg", ".png")):
-        return extraer_texto_imagen(file_bytes)
+        return extraer_texto_imagen(origen)
     
     elif nombre_archivo.endswith(".docx"):
-        return extraer_texto_word(file_bytes)
+        return extraer_texto_word(origen)
     
     elif nombre_archivo.endswith((".xls", ".xlsx")):
-        return extraer_texto_excel(file_bytes)
+        return extraer_texto_excel(origen)
     
     return "Formato no soportado o archivo vacio"
\ No newline at end of file
@@ -0,0 +1,225 @@
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# 🧩 Métricas en formato de texto de Prometheus (/metrics) y desglose de tiempos por petición
+# Cada worker de gunicorn expone sus propias métricas (el Dockerfile usa un worker por contenedor).
+
+BUCKETS_SEGUNDOS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+logger = logging.getLogger(__name__)
+
+registro = []  # todas las métricas creadas, en orden de exposición
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formato_etiquetas(nombres: tuple, valores: tuple, extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._valores = {}
+        registro.append(self)
+
+    def _clave(self, etiquetas: dict) -> tuple:
+        return tuple(str(etiquetas.get(n, "")) for n in self.etiquetas)
+
+    def _encabezado(self) -> list:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, cantidad: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def exponer(self) -> list:
+        with self._lock:
+            valores = dict(self._valores)
+        return self._encabezado() + [
+            f"{self.nombre}{_formato_etiquetas(self.etiquetas, clave)} {valor}"
+            for clave, valor in sorted(valores.items())
+        ]
+
+
+class Medidor(_Metrica):
+    """Valor instantáneo. Con `funcion`, se calcula al momento de exponer."""
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), funcion=None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def sumar(self, cantidad: float = 1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+    def restar(self, cantidad: float = 1, **etiquetas):
+        self.sumar(-cantidad, **etiquetas)
+
+    def exponer(self) -> list:
+        if self.funcion is not None:
+            try:
+                valores = {(): self.funcion()}
+            except Exception:
+                valores = {}
+        else:
+            with self._lock:
+                valores = dict(self._valores)
+        return self._encabezado() + [
+            f"{self.nombre}{_formato_etiquetas(self.etiquetas, clave)} {valor}"
+            for clave, valor in sorted(valores.items())
+        ]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor: float, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            conteos, suma, total = self._valores.get(clave, ([0] * len(self.buckets), 0.0, 0))
+            conteos = [c + (1 if valor <= limite else 0) for c, limite in zip(conteos, self.buckets)]
+            self._valores[clave] = (conteos, suma + valor, total + 1)
+
+    def exponer(self) -> list:
+        with self._lock:
+            valores = dict(self._valores)
+        lineas = self._encabezado()
+        for clave, (conteos, suma, total) in sorted(valores.items()):
+            for limite, conteo in zip(self.buckets, conteos):
+                etiquetas = _formato_etiquetas(self.etiquetas, clave, 'le="%s"' % limite)
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {conteo}")
+            etiquetas = _formato_etiquetas(self.etiquetas, clave, 'le="+Inf"')
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {total}")
+            etiquetas = _formato_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {round(suma, 6)}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {total}")
+        return lineas
+
+
+def exponer_metricas() -> str:
+    return "\n".join(linea for metrica in registro for linea in metrica.exponer()) + "\n"
+
+
+# 🔹 Métricas del clasificador
+
+DURACION_ETAPA = Histograma(
+    "clasificador_etapa_segundos", "Duración de cada etapa del flujo", ("etapa", "tipo"))
+DURACION_SOLICITUD = Histograma(
+    "clasificador_solicitud_segundos", "Duración total por ruta y código HTTP", ("ruta", "codigo"))
+PAGINAS_OCR = Contador("clasificador_ocr_paginas_total", "Páginas procesadas con Tesseract", ("origen",))
+OCR_REPETIDAS = Contador(
+    "clasificador_ocr_repetidas_total", "Páginas o imágenes con baja confianza repetidas a mayor resolución", ("origen",))
+PAGINAS_SIN_OCR = Contador(
+    "clasificador_ocr_paginas_omitidas_total", "Páginas que quedaron sin OCR por el presupuesto de páginas")
+FALLBACK_OCR = Contador(
+    "clasificador_fallback_ocr_total", "Documentos PDF que requirieron OCR (parcial o completo)", ("modo",))
+CARACTERES_EXTRAIDOS = Contador(
+    "clasificador_caracteres_extraidos_total", "Caracteres extraídos por tipo de archivo", ("tipo",))
+CARACTERES_NORMALIZADOS = Contador(
+    "clasificador_caracteres_normalizados_total", "Caracteres que quedan tras normalizar el texto extraído", ("tipo",))
+CARACTERES_PROMPT = Contador(
+    "clasificador_prompt_caracteres_total", "Caracteres enviados a Gemini", ("llamada",))
+TOKENS_PROMPT = Contador(
+    "clasificador_prompt_tokens_estimados_total", "Tokens estimados enviados a Gemini", ("llamada",))
+SOLICITUDES_EN_CURSO = Medidor(
+    "clasificador_solicitudes_en_curso", "Peticiones en proceso en este worker", ("ruta",))
+
+
+# 🔹 Desglose de tiempos por petición (se escribe como una línea JSON en el log)
+
+class _Desglose:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.inicio = time.perf_counter()
+        self.etapas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa: str, segundos: float):
+        with self._lock:
+            actual = self.etapas.setdefault(etapa, {"n": 0, "segundos": 0.0})
+            actual["n"] += 1
+            actual["segundos"] += segundos
+
+
+_desglose_actual = contextvars.ContextVar("desglose_actual", default=None)
+
+
+def propagar_contexto(funcion):
+    """
+    Envuelve `funcion` para ejecutarla en una copia del contexto actual. Se usa al
+    enviar tareas a hilos, para que sus tiempos lleguen al desglose de la petición.
+    """
+    return functools.partial(contextvars.copy_context().run, funcion)
+
+
+@contextmanager
+def cronometro(etapa: str, tipo: str = ""):
+    """Mide un bloque: lo observa en el histograma de etapas y lo suma al desglose de la petición."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_etapa(etapa, time.perf_counter() - inicio, tipo)
+
+
+def registrar_etapa(etapa: str, segundos: float, tipo: str = ""):
+    DURACION_ETAPA.observar(segundos, etapa=etapa, tipo=tipo)
+    desglose = _desglose_actual.get()
+    if desglose is not None:
+        desglose.registrar(etapa, segundos)
+
+
+@contextmanager
+def medir_solicitud(ruta: str):
+    """
+    Cuenta la petición como en curso y, al terminar, escribe su desglose de tiempos
+    en el log como JSON. El bloque puede fijar el código con `estado["codigo"] = ...`.
+    """
+    desglose = _Desglose(ruta)
+    token = _desglose_actual.set(desglose)
+    estado = {"codigo": 500}
+    SOLICITUDES_EN_CURSO.sumar(ruta=ruta)
+    try:
+        yield estado
+    finally:
+        SOLICITUDES_EN_CURSO.restar(ruta=ruta)
+        _desglose_actual.reset(token)
+        total = time.perf_counter() - desglose.inicio
+        DURACION_SOLICITUD.observar(total, ruta=ruta, codigo=estado["codigo"])
+        logger.info(json.dumps({
+            "evento": "tiempos_solicitud",
+            "ruta": ruta,
+            "codigo": estado["codigo"],
+            "total_s": round(total, 3),
+            "etapas": {
+                etapa: {"n": datos["n"], "segundos": round(datos["segundos"], 3)}
+                for etapa, datos in sorted(desglose.etapas.items())
+            },
+        }, ensure_ascii=False))
@@ -0,0 +1,97 @@
+import os
+import re
+from clasificador.utils.conversor_texto import SEPARADOR_PAGINA
+
+# 🧩 Normalización del texto extraído antes de enviarlo a Gemini
+# Los extractores entregan líneas ("\n") y páginas ("\f"). Aquí se quitan los encabezados
+# y pies que se repiten en cada página (membrete de la Rama Judicial, número de página),
+# los tokens de ruido de OCR y los espacios de relleno: menos caracteres por prompt.
+NORMALIZACION_ACTIVA = os.getenv("NORMALIZACION_ACTIVA", "1") == "1"
+# Forma parte de la clave de la caché de extracción: cambiarla invalida los textos guardados
+NORMALIZACION_VERSION = f"1-{int(NORMALIZACION_ACTIVA)}"
+
+# Líneas del principio y del final de cada página donde se buscan encabezados y pies
+NORMALIZACION_LINEAS_BORDE = 5
+# Una línea de borde se considera repetida si aparece en al menos esta fracción de páginas
+NORMALIZACION_FRACCION_PAGINAS = 0.5
+NORMALIZACION_MIN_PAGINAS = 3
+NORMALIZACION_MAX_LARGO_LINEA = 150
+
+_DIGITOS = re.compile(r"\d+")
+# Puntuación que se quita de los extremos de un token antes de evaluarlo
+_PUNTUACION = ".,;:()¿?¡!\"'“”‘’"
+# Caracteres que en un token sin letras ni dígitos delatan ruido (bordes de tabla, firmas, OCR)
+_RUIDO = set("|¦~_^`{}[]<>\\=*«»")
+
+
+def _clave_linea(linea: str) -> str:
+    # "Página 3 de 12" y "Página 4 de 12" cuentan como la misma línea
+    return _DIGITOS.sub("#", linea.lower())
+
+
+def _es_ruido(token: str) -> bool:
+    nucleo = token.strip(_PUNTUACION)
+    if not nucleo:
+        return len(token) > 3
+    alfanumericos = sum(c.isalnum() for c in nucleo)
+    if not alfanumericos:
+        return len(nucleo) > 3 or any(c in _RUIDO for c in nucleo)
+    return len(nucleo) >= 3 and alfanumericos / len(nucleo) < 0.5
+
+
+def _lineas_repetidas(paginas: list) -> set:
+    """Claves de las líneas de encabezado o pie presentes en buena parte de las páginas."""
+    if len(paginas) < NORMALIZACION_MIN_PAGINAS:
+        return set()
+    apariciones = {}
+    for lineas in paginas:
+        # En páginas cortas solo el primer y último tercio cuentan como borde
+        n = max(1, min(NORMALIZACION_LINEAS_BORDE, len(lineas) // 3))
+        borde = lineas[:n] + lineas[-n:]
+        for clave in {_clave_linea(l) for l in borde if len(l) <= NORMALIZACION_MAX_LARGO_LINEA}:
+            apariciones[clave] = apariciones.get(clave, 0) + 1
+    minimo = max(NORMALIZACION_MIN_PAGINAS, len(paginas) * NORMALIZACION_FRACCION_PAGINAS)
+    return {clave for clave, n in apariciones.items() if n >= minimo}
+
+
+def normalizar_texto(texto: str) -> tuple:
+    """
+    Devuelve (texto_compacto, estadisticas). Las líneas repetidas entre páginas se
+    conservan solo la primera vez (el membrete suele nombrar el despacho). El texto
+    resultante tiene una línea por renglón y una línea en blanco entre páginas.
+    """
+    estadisticas = {"caracteres_antes": len(texto), "caracteres_despues": len(texto),
+                    "lineas_repetidas": 0, "tokens_ruido": 0}
+    if not NORMALIZACION_ACTIVA:
+        return texto, estadisticas
+
+    paginas = []
+    for pagina in texto.split(SEPARADOR_PAGINA):
+        lineas = []
+        for linea in pagina.splitlines():
+            tokens = linea.split()
+            limpios = [t for t in tokens if not _es_ruido(t)]
+            estadisticas["tokens_ruido"] += len(tokens) - len(limpios)
+            if limpios:
+                lineas.append(" ".join(limpios))
+        paginas.append(lineas)
+
+    repetidas = _lineas_repetidas(paginas)
+    vistas = set()
+    bloques = []
+    for lineas in paginas:
+        conservadas = []
+        for linea in lineas:
+            clave = _clave_linea(linea)
+            if clave in repetidas:
+                if clave in vistas:
+                    estadisticas["lineas_repetidas"] += 1
+                    continue
+                vistas.add(clave)
+            conservadas.append(linea)
+        if conservadas:
+            bloques.append("\n".join(conservadas))
+
+    compacto = "\n\n".join(bloques)
+    estadisticas["caracteres_despues"] = len(compacto)
+    return compacto, estadisticas
@@ -0,0 +1,124 @@
+import contextvars
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import BrokenExecutor, Future
+from contextlib import contextmanager
+
+# 🧩 Reparto justo de un pool compartido entre peticiones
+# Cada petición tiene su propia cola de tareas y el pool recibe como máximo `capacidad`
+# tareas a la vez, tomadas por turnos (round-robin) entre las peticiones con trabajo
+# pendiente: un PDF de 200 páginas no deja esperando a los casos pequeños.
+
+logger = logging.getLogger(__name__)
+
+_solicitud_actual = contextvars.ContextVar("solicitud_actual", default=None)
+
+
+@contextmanager
+def identificar_solicitud():
+    """Las tareas enviadas dentro del bloque (y en hilos con su contexto) comparten turno."""
+    token = _solicitud_actual.set(object())
+    try:
+        yield
+    finally:
+        _solicitud_actual.reset(token)
+
+
+class PlanificadorJusto:
+    """
+    Envía tareas a un executor compartido, creado en el primer uso de cada worker
+    (no sobrevive al fork), repartiéndolo por turnos entre peticiones. Si el executor
+    se rompe (un proceso del pool murió), se descarta y el siguiente envío crea otro.
+    """
+
+    def __init__(self, crear_executor, capacidad: int):
+        self._crear_executor = crear_executor
+        self.capacidad = max(1, capacidad)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._colas = OrderedDict()  # solicitud -> deque de (future, funcion, args)
+        self._en_curso = 0
+
+    def _obtener_executor(self):
+        if self._pid != os.getpid():
+            # Worker recién creado por fork: las colas y el executor son del padre
+            self._executor = None
+            self._pid = os.getpid()
+            self._colas.clear()
+            self._en_curso = 0
+        if self._executor is None:
+            self._executor = self._crear_executor()
+        return self._executor
+
+    def _descartar_executor(self, executor, error: Exception):
+        with self._lock:
+            if self._executor is not executor:
+                return  # ya descartado por otra tarea del mismo pool
+            self._executor = None
+        logger.warning(f"⚠️ Pool roto ({type(error).__name__}: {error}); se creará uno nuevo")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def enviar(self, funcion, *args) -> Future:
+        future = Future()
+        solicitud = _solicitud_actual.get()
+        with self._lock:
+            self._obtener_executor()
+            self._colas.setdefault(solicitud, deque()).append((future, funcion, args))
+        self._despachar()
+        return future
+
+    def _siguiente(self):
+        # Primera petición con trabajo; pasa al final de la ronda
+        while self._colas:
+            solicitud, cola = next(iter(self._colas.items()))
+            future, funcion, args = cola.popleft()
+            if cola:
+                self._colas.move_to_end(solicitud)
+            else:
+                del self._colas[solicitud]
+            if future.set_running_or_notify_cancel():
+                return future, funcion, args
+        return None
+
+    def _despachar(self):
+        while True:
+            with self._lock:
+                if self._en_curso >= self.capacidad:
+                    return
+                tarea = self._siguiente()
+                if tarea is None:
+                    return
+                self._en_curso += 1
+                executor = self._obtener_executor()
+            future, funcion, args = tarea
+            try:
+                interno = executor.submit(funcion, *args)
+            except Exception as e:
+                self._terminar(future, None, e, executor)
+                continue
+            interno.add_done_callback(
+                lambda f, future=future, executor=executor: self._terminar(future, f, executor=executor))
+
+    def _terminar(self, future: Future, interno: Future, error: Exception = None, executor=None):
+        with self._lock:
+            self._en_curso -= 1
+        if error is None:
+            error = interno.exception()
+        if isinstance(error, BrokenExecutor):
+            self._descartar_executor(executor, error)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(interno.result())
+        self._despachar()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "en_curso": self._en_curso,
+                "en_espera": sum(len(cola) for cola in self._colas.values()),
+                "solicitudes": len(self._colas),
+            }
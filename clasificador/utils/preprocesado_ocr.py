@@ -0,0 +1,126 @@
+import os
+from statistics import median
+
+# 🧩 Preprocesado de páginas e imágenes antes de Tesseract
+# Escala de grises → recorte de bordes → enderezado → escala a una altura de renglón
+# objetivo → binarización. Solo usa PIL: los perfiles de filas y columnas se obtienen
+# reduciendo la imagen a una fila o columna de píxeles (promedio por caja).
+OCR_ALTURA_LINEA = int(os.getenv("OCR_ALTURA_LINEA", "40"))  # píxeles por renglón de texto
+OCR_BINARIZAR = os.getenv("OCR_BINARIZAR", "1") == "1"
+OCR_MAX_INCLINACION = 5.0  # grados que se buscan a cada lado
+OCR_MAX_AMPLIACION = 2.0  # solo en el segundo intento de imágenes con letra pequeña
+
+_ANCHO_ANALISIS = 800  # la inclinación se estima sobre una miniatura
+_MARGEN_RECORTE = 0.02  # fracción del lado que se conserva alrededor del contenido
+# Fracción de tinta de una fila o columna: por debajo es blanco, por encima es fondo oscuro (bordes de foto)
+_TINTA_MIN = 0.005
+_TINTA_MAX = 0.9
+_TINTA_RENGLON = 0.02
+
+
+def _umbral_otsu(gris) -> int:
+    histograma = gris.histogram()
+    total = sum(histograma)
+    suma_total = sum(i * h for i, h in enumerate(histograma))
+    suma_fondo = peso_fondo = 0
+    mejor, umbral = -1.0, 128
+    for i, h in enumerate(histograma):
+        peso_fondo += h
+        peso_frente = total - peso_fondo
+        if not peso_fondo:
+            continue
+        if not peso_frente:
+            break
+        suma_fondo += i * h
+        diferencia = suma_fondo / peso_fondo - (suma_total - suma_fondo) / peso_frente
+        varianza = peso_fondo * peso_frente * diferencia * diferencia
+        if varianza > mejor:
+            mejor, umbral = varianza, i
+    return umbral
+
+
+def _tinta(gris, umbral: int):
+    """Máscara con el texto en blanco (255) y el papel en negro."""
+    return gris.point([255 if p <= umbral else 0 for p in range(256)])
+
+
+def _perfil(tinta, eje: str) -> list:
+    """Fracción de tinta por fila ("filas") o por columna ("columnas")."""
+    from PIL import Image
+
+    tamano = (1, tinta.height) if eje == "filas" else (tinta.width, 1)
+    return [v / 255 for v in tinta.resize(tamano, Image.BOX).getdata()]
+
+
+def _limites_contenido(perfil: list) -> tuple:
+    indices = [i for i, v in enumerate(perfil) if _TINTA_MIN < v < _TINTA_MAX]
+    if not indices:
+        return 0, len(perfil)
+    margen = int(len(perfil) * _MARGEN_RECORTE)
+    return max(0, indices[0] - margen), min(len(perfil), indices[-1] + 1 + margen)
+
+
+def _recortar_bordes(gris, tinta) -> tuple:
+    izquierda, derecha = _limites_contenido(_perfil(tinta, "columnas"))
+    arriba, abajo = _limites_contenido(_perfil(tinta, "filas"))
+    caja = (izquierda, arriba, derecha, abajo)
+    return gris.crop(caja), tinta.crop(caja)
+
+
+def _angulo_inclinacion(tinta) -> float:
+    """Ángulo que endereza los renglones: el que deja el perfil de filas más nítido."""
+    from PIL import Image
+
+    muestra = tinta.copy()
+    muestra.thumbnail((_ANCHO_ANALISIS, _ANCHO_ANALISIS * 2))
+
+    def nitidez(angulo):
+        perfil = _perfil(muestra.rotate(angulo, resample=Image.NEAREST, fillcolor=0), "filas")
+        return sum((a - b) ** 2 for a, b in zip(perfil, perfil[1:]))
+
+    # Búsqueda gruesa cada 0.5° y luego fina cada 0.1° alrededor del mejor
+    pasos = int(OCR_MAX_INCLINACION * 2)
+    mejor = max((i / 2 for i in range(-pasos, pasos + 1)), key=nitidez)
+    return max((mejor + i / 10 for i in range(-4, 5)), key=nitidez)
+
+
+def _altura_renglon(tinta):
+    """Altura mediana de los renglones (filas seguidas con tinta), o None si no hay texto claro."""
+    alturas, actual = [], 0
+    for valor in _perfil(tinta, "filas") + [0]:
+        if valor > _TINTA_RENGLON:
+            actual += 1
+        else:
+            if actual >= 3:
+                alturas.append(actual)
+            actual = 0
+    return median(alturas) if len(alturas) >= 3 else None
+
+
+def preprocesar_imagen(imagen, ampliar: bool = False):
+    """
+    Imagen lista para Tesseract. Con `ampliar`, la letra más pequeña que la altura
+    objetivo se agranda (hasta OCR_MAX_AMPLIACION); sin él solo se reduce.
+    """
+    from PIL import Image, ImageOps
+
+    gris = ImageOps.autocontrast(ImageOps.exif_transpose(imagen).convert("L"), cutoff=1)
+    umbral = _umbral_otsu(gris)
+    gris, tinta = _recortar_bordes(gris, _tinta(gris, umbral))
+
+    angulo = _angulo_inclinacion(tinta)
+    if abs(angulo) >= 0.2:
+        gris = gris.rotate(angulo, resample=Image.BICUBIC, expand=True, fillcolor=255)
+        tinta = _tinta(gris, umbral)
+
+    altura = _altura_renglon(tinta)
+    if altura:
+        factor = OCR_ALTURA_LINEA / altura
+        factor = min(factor, OCR_MAX_AMPLIACION) if ampliar else min(factor, 1.0)
+        if abs(factor - 1.0) > 0.1:
+            tamano = (max(1, round(gris.width * factor)), max(1, round(gris.height * factor)))
+            gris = gris.resize(tamano, Image.LANCZOS)
+
+    if OCR_BINARIZAR:
+        return gris.point([255 if p > umbral else 0 for p in range(256)])
+    return gris
@@ -0,0 +1,34 @@
+import os
+import sqlite3
+import threading
+
+
+class ConexionesSQLite:
+    """
+    Entrega una conexión SQLite por hilo y por proceso: sqlite3 no permite
+    compartirlas entre hilos ni heredarlas tras el fork de gunicorn.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+
+    def obtener(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None or getattr(self._local, "pid", None) != os.getpid():
+            con = sqlite3.connect(self.ruta, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+            self._local.pid = os.getpid()
+        return con
+
+    def ejecutar_ddl(self, sentencia: str):
+        """Ejecuta DDL con una conexión temporal (no se reutiliza tras un fork)."""
+        con = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            with con:
+                con.execute(sentencia)
+        finally:
+            con.close()
@@ -0,0 +1,24 @@
+import os
+
+# 🧩 Configuración de gunicorn (se lee sola desde el directorio de trabajo, /app en el contenedor)
+# PRECARGAR_EXTRACTORES=1 importa los backends de extracción en el proceso maestro antes
+# del fork: el arranque tarda más, pero la primera petición de cada worker no los importa.
+PRECARGAR_EXTRACTORES = os.getenv("PRECARGAR_EXTRACTORES", "0") == "1"
+
+# Worker con hilos: las peticiones concurrentes comparten los pools de extracción y OCR
+# del proceso, y el control de admisión (admision_service.py) decide cuántas procesan a
+# la vez. Los hilos deben cubrir ADMISION_MAX_ACTIVAS + ADMISION_MAX_COLA, más un margen
+# para /healthz, /metrics y /jobs, de modo que el 429 llegue antes que la cola del socket.
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+
+def on_starting(server):
+    if not os.getenv("GEMINI_API_KEY"):
+        server.log.warning("⚠️ No se encontró GEMINI_API_KEY: las llamadas a Gemini fallarán")
+    if PRECARGAR_EXTRACTORES:
+        from clasificador.utils.conversor_texto import precargar_extractores
+
+        estado = precargar_extractores()
+        server.log.info(f"🔥 Extractores precargados: {estado}")
@@ -0,0 +1,81 @@
+import unittest
+
+from clasificador.prompts.reglas_procesales import NO_SE_MENCIONA, completar_resultado, extraer_campos
+
+
+class NombreDespachoTest(unittest.TestCase):
+
+    def test_punto_final_cierra_el_nombre(self):
+        campos = extraer_campos("Juzgado Quinto Civil Municipal de Cali. Presentada el 12/03/2022")
+        self.assertEqual(campos["juzgado_o_autoridad"], "Juzgado Quinto Civil Municipal de Cali")
+        self.assertEqual(campos["fecha_radicacion"], "12/03/2022")
+
+    def test_punto_final_en_mayusculas(self):
+        campos = extraer_campos("JUZGADO QUINTO CIVIL MUNICIPAL DE CALI. PRESENTADA EL 12/03/2022")
+        self.assertEqual(campos["juzgado_o_autoridad"], "Juzgado Quinto Civil Municipal de Cali")
+        self.assertEqual(campos["fecha_radicacion"], "12/03/2022")
+
+    def test_conserva_dc(self):
+        for texto in ("Juzgado Tercero Civil del Circuito de Bogotá D.C. Presentada el 12/03/2022",
+                      "Juzgado Tercero Civil del Circuito de Bogotá D. C. Presentada el 12/03/2022"):
+            with self.subTest(texto=texto):
+                campos = extraer_campos(texto)
+                self.assertEqual(campos["juzgado_o_autoridad"], "Juzgado Tercero Civil del Circuito de Bogotá D.C.")
+                self.assertEqual(campos["fecha_radicacion"], "12/03/2022")
+
+    def test_dc_al_final_de_la_oracion(self):
+        campos = extraer_campos("JUZGADO TERCERO CIVIL DEL CIRCUITO DE BOGOTÁ D.C. Radicado No. "
+                                "11001-31-03-003-2023-00123-00")
+        self.assertEqual(campos["juzgado_o_autoridad"], "Juzgado Tercero Civil del Circuito de Bogotá D.C.")
+        self.assertEqual(campos["numero_radicado"], "11001310300320230012300")
+
+    def test_abreviatura_dentro_del_nombre(self):
+        campos = extraer_campos("Juzgado 5 Civil Mpal. de Cali, 3 de junio de 2024")
+        self.assertEqual(campos["juzgado_o_autoridad"], "Juzgado 5 Civil Mpal. de Cali")
+
+    def test_especialidad_tras_conector(self):
+        campos = extraer_campos("JUZGADO DE FAMILIA DE PASTO")
+        self.assertEqual(campos["juzgado_o_autoridad"], "Juzgado de Familia de Pasto")
+
+    def test_juzgado_en_texto_narrativo(self):
+        for texto in ("El juzgado admite la demanda.",
+                      "El Juzgado admite la demanda.",
+                      "el juzgado de conocimiento fijó fecha"):
+            with self.subTest(texto=texto):
+                self.assertNotIn("juzgado_o_autoridad", extraer_campos(texto))
+
+
+class CiudadTest(unittest.TestCase):
+
+    def test_ciudad_con_mayuscula(self):
+        self.assertEqual(extraer_campos("EN LA CIUDAD DE CALI")["ciudad"], "Cali")
+        self.assertEqual(extraer_campos("en la ciudad de Neiva")["ciudad"], "Neiva")
+
+    def test_ciudad_en_minusculas_no_es_nombre(self):
+        campos = extraer_campos("El demandante reside en la ciudad de residencia indicada. "
+                                "El juzgado admite la demanda.")
+        self.assertEqual(campos, {})
+
+
+
+class CompletarResultadoTest(unittest.TestCase):
+    REGLAS = {"numero_radicado": "11001310300320230012300", "ciudad": "Bogotá D.C."}
+
+    def _completar(self, campos_modelo: dict) -> dict:
+        return completar_resultado({"campos": dict(campos_modelo)}, dict(self.REGLAS))["campos"]
+
+    def test_radicado_valido_del_modelo_se_conserva(self):
+        campos = self._completar({"numero_radicado": "11001-31-03-003-2023-00124-00"})
+        self.assertEqual(campos["numero_radicado"], "11001-31-03-003-2023-00124-00")
+
+    def test_radicado_invalido_del_modelo_se_reemplaza(self):
+        campos = self._completar({"numero_radicado": "11001-31-03-003-2023-0012"})
+        self.assertEqual(campos["numero_radicado"], self.REGLAS["numero_radicado"])
+
+    def test_campos_ausentes_se_completan(self):
+        campos = self._completar({"numero_radicado": NO_SE_MENCIONA, "ciudad": ""})
+        self.assertEqual(campos, self.REGLAS)
+
+
+if __name__ == "__main__":
+    unittest.main()